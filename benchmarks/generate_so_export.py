@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_transform_functions import ITEM_PREFIXES, MATERIAL_TOKENS, LENGTH_TOKENS  # noqa: E402
+
+SO_PREFIX = "SalesOrder1yearSalesOnlyHKResults906"
+
+# Prefixes of items dropped by filter_so (services, shipping, ...)
+OTHER_PREFIXES = ('SHIP-', 'SVC-', 'GC-', 'MISC-')
+
+
+def generate_skus(count, rng, unknown_share=0.02):
+    """
+    Function to generate SKUs following the patterns of the real item codes.
+
+    SKUs look like '<prefix>F<family>-<material>-<size>[-<length>]', with the prefixes of
+    ITEM_PREFIXES and the material and length tokens of MATERIAL_TOKENS and LENGTH_TOKENS,
+    so that parse_skus recognizes them. A share of the SKUs carries no material token and
+    ends up as 'Unknown'.
+
+    Args:
+    - count (int): Number of distinct SKUs.
+    - rng (np.random.Generator): Random generator.
+    - unknown_share (float): Share of SKUs without a material token.
+
+    Returns:
+    - list: Distinct SKUs.
+    """
+    materials = sorted({token.strip('-').upper() for token, _ in MATERIAL_TOKENS if token.endswith('-')})
+    lengths = [token.strip('-').upper() for token, _ in LENGTH_TOKENS if ' ' not in token]
+    skus = set()
+    while len(skus) < count:
+        prefix = ITEM_PREFIXES[rng.integers(len(ITEM_PREFIXES))]
+        family = f"F{rng.integers(1, 120)}"
+        material = 'XX' if rng.random() < unknown_share else materials[rng.integers(len(materials))]
+        size = rng.integers(1, 21)
+        sku = f"{prefix}{family}-{material}-{size}"
+        if rng.random() < 0.4:
+            sku += f"-{lengths[rng.integers(len(lengths))]}"
+        skus.add(sku)
+    return sorted(skus)
+
+
+def generate_so_export(filepath, rows=1_000_000, skus=5_000, start_date='2023-10-01', end_date='2024-12-31',
+                       seed=0, other_share=0.03):
+    """
+    Function to write a synthetic sales order export shaped like the NetSuite saved search.
+
+    SKU popularity follows a Zipf-like distribution and several lines share an order
+    number, as in the real exports. Dates are written as M/D/YYYY strings.
+
+    Args:
+    - filepath (str): Path of the CSV written.
+    - rows (int): Number of order lines.
+    - skus (int): Number of distinct SKUs.
+    - start_date, end_date (str): Date span of the orders (inclusive).
+    - seed (int): Seed of the random generator, the same seed gives the same file.
+    - other_share (float): Share of lines for items outside ITEM_PREFIXES.
+
+    Returns:
+    - str: filepath.
+    """
+    rng = np.random.default_rng(seed)
+    sku_list = np.array(generate_skus(skus, rng), dtype=object)
+    weights = 1.0 / np.arange(1, len(sku_list) + 1) ** 0.8
+    items = sku_list[rng.permutation(len(sku_list))][rng.choice(len(sku_list), rows, p=weights / weights.sum())]
+
+    others = rng.random(rows) < other_share
+    items[others] = [OTHER_PREFIXES[i] + str(n) for i, n in
+                     zip(rng.integers(len(OTHER_PREFIXES), size=others.sum()), rng.integers(1, 50, size=others.sum()))]
+
+    days = pd.date_range(start_date, end_date, freq='D')
+    dates = days[np.sort(rng.integers(len(days), size=rows))]
+    date_strings = pd.Series(dates.month.astype(str)) + '/' + pd.Series(dates.day.astype(str)) + '/' \
+        + pd.Series(dates.year.astype(str))
+
+    quantities = rng.geometric(0.3, size=rows)
+    prices = np.round(rng.lognormal(3.5, 0.8, size=rows), 2)
+    export = pd.DataFrame({
+        'Internal ID': np.arange(1, rows + 1),
+        'Document Number': 'SO' + pd.Series(np.arange(rows) // 3 + 100000).astype(str),
+        'Item': items,
+        'Product Set ID': rng.integers(1, 400, size=rows).astype(str),
+        'Date': date_strings,
+        'Quantity': quantities,
+        'Amount': np.round(quantities * prices, 2),
+        'Memo': '',
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    export.to_csv(filepath, index=False)
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic sales order export.')
+    parser.add_argument('folder', help='Folder the export is written to')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--skus', type=int, default=5_000)
+    parser.add_argument('--start-date', default='2023-10-01')
+    parser.add_argument('--end-date', default='2024-12-31')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    filepath = os.path.join(args.folder, f"{SO_PREFIX}.csv")
+    generate_so_export(filepath, args.rows, args.skus, args.start_date, args.end_date, args.seed)
+    print(f"Wrote {args.rows:,} lines to '{filepath}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import argparse
+import datetime
+import gc
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from generate_so_export import SO_PREFIX, generate_so_export  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+PERIOD_TYPES = ['D', 'W', 'M', 'Y']
+
+
+def measure(function, repeat=3):
+    """
+    Function to time a call and measure its peak memory.
+
+    The call is timed repeat times without tracing, then run once more under tracemalloc
+    (which also sees the numpy buffers) to get the peak of memory allocated during the call.
+
+    Args:
+    - function (callable): Zero-argument function to measure.
+    - repeat (int): Number of timed calls.
+
+    Returns:
+    - dict: 'seconds' (median), 'min_seconds', 'peak_mb' and 'result' (last return value).
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': statistics.median(timings), 'min_seconds': min(timings), 'peak_mb': peak / 2 ** 20,
+            'result': result}
+
+
+def payload_size(output):
+    """
+    Function to measure the JSON size of a callback output as Dash sends it.
+
+    Returns:
+    - dict: 'bytes' and 'gzip_bytes' of the serialized output.
+    """
+    body = json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder).encode()
+    return {'bytes': len(body), 'gzip_bytes': len(gzip.compress(body, 6))}
+
+
+def selections(merged_df):
+    """
+    Function to pick filter selections of decreasing selectivity from the data.
+
+    Returns:
+    - dict: Name -> (category, family, material, item) filter lists.
+    """
+    def most_common(column, count=1):
+        return merged_df[column].value_counts().index[:count].astype(str).tolist()
+
+    return {
+        'all': ([], [], [], []),
+        'category': (most_common('Category'), [], [], []),
+        'material': ([], [], most_common('Material'), []),
+        'family+material': ([], most_common('Family'), most_common('Material', 3), []),
+        'items10': ([], [], [], most_common('Item', 10)),
+    }
+
+
+def clear_caches(app_module):
+    for name in ('filter_cache', 'table_cache', 'card_cache', 'scatter_cache'):
+        cache = getattr(app_module, name, None)
+        if cache is not None:
+            cache.clear()
+
+
+def callback(app_module, name):
+    function = getattr(app_module, name)
+    return getattr(function, '__wrapped__', function)
+
+
+def run_benchmarks(rows, skus, start_date, end_date, seed, repeat):
+    """
+    Function to run every benchmark on a synthetic export.
+
+    Returns:
+    - dict: Benchmark name -> measurements.
+    """
+    results = {}
+
+    def record(name, measurement, **extra):
+        measurement.pop('result', None)
+        results[name] = {**measurement, **extra}
+        print(f"{name:55s} {measurement['seconds'] * 1000:10.1f} ms {measurement['peak_mb']:9.1f} MB"
+              + ''.join(f"  {key}={value}" for key, value in extra.items()))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        download_dir = os.path.join(work_dir, 'downloads')
+        so_filepath = os.path.join(download_dir, f"{SO_PREFIX}.csv")
+        start = time.perf_counter()
+        generate_so_export(so_filepath, rows, skus, start_date, end_date, seed)
+        print(f"Generated {rows:,} lines in {time.perf_counter() - start:.1f} s ({os.path.getsize(so_filepath) / 2 ** 20:.1f} MB)")
+
+        # main.py loads the export at import, point it at the synthetic data and a scratch cache
+        os.environ['SALES_DOWNLOAD_FOLDER'] = download_dir
+        os.environ['SALES_CACHE_FOLDER'] = os.path.join(work_dir, 'cache')
+        os.environ['SALES_REFRESH_INTERVAL'] = '0'
+        import data_transform_functions as dtf
+        import main as app_module
+
+        # Ingestion and preprocessing
+        agg = measure(lambda: dtf.load_so_csv(so_filepath, app_module.SO_MIN_DATE, app_module.SO_CHUNK_SIZE), 1)
+        agg_so_df = agg['result']
+        record('ingest/load_so_csv', agg, rows=len(agg_so_df))
+        raw = pd.read_csv(so_filepath, usecols=dtf.SO_COLUMNS, dtype=dtf.SO_DTYPES)
+        record('ingest/agg_so', measure(lambda: dtf.agg_so(raw), repeat))
+        items = pd.Series(agg_so_df['Item'].unique())
+        record('preprocess/classify_items(material)', measure(lambda: dtf.classify_items(items, dtf.MATERIAL_TOKENS), repeat),
+               items=len(items))
+        record('preprocess/extract_material(per item)', measure(lambda: items.map(dtf.extract_material), 1))
+        record('preprocess/prepare_merged_df', measure(lambda: app_module.prepare_merged_df(agg_so_df), repeat))
+        for name in os.listdir(os.environ['SALES_CACHE_FOLDER']):
+            os.remove(os.path.join(os.environ['SALES_CACHE_FOLDER'], name))
+        record('load/load_dataset(cold)', measure(lambda: app_module.load_dataset(so_filepath), 1))
+        record('load/load_dataset(cached)', measure(lambda: app_module.load_dataset(so_filepath), repeat))
+
+        dataset = app_module.dataset_handle.current()
+        merged_df = dataset.merged_df
+        first, last = merged_df['Sales Date'].min(), merged_df['Sales Date'].max()
+        date_ranges = {
+            'full': (first.isoformat(), last.isoformat()),
+            'last30d': ((last - pd.Timedelta(days=29)).isoformat(), last.isoformat()),
+        }
+
+        # Query and callback bodies, with the result caches cleared before every call
+        for type_filter in PERIOD_TYPES:
+            for range_name, (start, end) in date_ranges.items():
+                for selection_name, (categories, families, materials, item_list) in selections(merged_df).items():
+                    label = f"{type_filter}/{range_name}/{selection_name}"
+                    args = (start, end, type_filter, categories, families, materials, item_list)
+
+                    def uncached(function, *extra):
+                        def run():
+                            clear_caches(app_module)
+                            return function(*args, *extra)
+                        return run
+
+                    key = app_module.normalize_filters(*args)
+                    filtered = measure(lambda: app_module.query_sales(dataset, *key), repeat)
+                    record(f"filter_data/{label}", filtered, rows=len(filtered['result']))
+
+                    for name, extra in (('update_bar_plots', ('desc',)),
+                                        ('update_time_series_plot', ()),
+                                        ('update_sales_cards', ()),
+                                        ('update_table', (0, 20, [], '')),
+                                        ('update_scatter_plot', ('Sales Amount', 'Sales Period', 'Item'))):
+                        measurement = measure(uncached(callback(app_module, name), *extra), repeat)
+                        record(f"{name}/{label}", measurement, **payload_size(measurement['result']))
+
+        for search_value in ('', 'ED-F1', 'SS-1', 'L7'):
+            measurement = measure(lambda: callback(app_module, 'update_item_options')(search_value, [], [], [], []),
+                                  repeat)
+            record(f"update_item_options/'{search_value}'", measurement, **payload_size(measurement['result']))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """
+    Function to print the change of every benchmark against a previous results file.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f"\nCompared with '{baseline_path}' (ratio > 1 means slower / bigger now):")
+    for name, measurement in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratios = [f"{key} x{measurement[key] / previous[key]:.2f}"
+                  for key in ('seconds', 'peak_mb', 'bytes') if previous.get(key) and key in measurement]
+        print(f"{name:55s} " + '  '.join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ingestion, preprocessing and callbacks on synthetic data.')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Order lines of the synthetic export')
+    parser.add_argument('--skus', type=int, default=5_000, help='Distinct SKUs')
+    parser.add_argument('--start-date', default='2023-10-01')
+    parser.add_argument('--end-date', default='2024-12-31')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed calls per benchmark')
+    parser.add_argument('--output', help='Results file (default: results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results file to compare with')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rows, args.skus, args.start_date, args.end_date, args.seed, args.repeat)
+
+    run_at = datetime.datetime.now()
+    output = args.output or os.path.join(RESULTS_DIR, run_at.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'run_at': run_at.isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'params': vars(args),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to '{output}'")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
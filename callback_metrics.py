@@ -0,0 +1,323 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import request
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BYTE_BUCKETS = (1_000, 10_000, 30_000, 100_000, 300_000, 1_000_000, 3_000_000, 10_000_000)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Histogram:
+    # Cumulative-on-render histogram of the observations of one label value
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class CallbackMetrics:
+    """
+    Latency, row counts and response sizes of the dashboard callbacks.
+
+    Functions wrapped with instrument() record their duration and the exceptions they
+    raise; inside them, count_rows() attributes the number of rows read and produced to
+    the innermost instrumented call of the thread. Response sizes are passed in by
+    response_stats.measure_callback_responses. render() returns everything in the
+    Prometheus text format.
+
+    Args:
+    - enabled (bool): When False, instrument() returns the functions unchanged and nothing
+      is recorded.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {
+            'duration': {},
+            'input_rows': {},
+            'output_rows': {},
+            'response_bytes': {},
+        }
+        self._exceptions = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Names of the instrumented calls running in each thread, innermost last
+        self._active = {}
+
+    def _observe(self, metric, name, value, buckets):
+        with self._lock:
+            histogram = self._metrics[metric].get(name)
+            if histogram is None:
+                histogram = self._metrics[metric][name] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def instrument(self, name=None):
+        """
+        Decorator recording the duration of every call of a function.
+
+        Args:
+        - name (str): Label of the function in the metrics (default: its __name__).
+
+        Returns:
+        - callable: Decorator.
+        """
+        def decorator(function):
+            if not self.enabled:
+                return function
+            label = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                stack = getattr(self._local, 'stack', None)
+                if stack is None:
+                    stack = self._local.stack = []
+                if not stack:
+                    with self._lock:
+                        self._active[threading.get_ident()] = stack
+                stack.append(label)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                except Exception as e:
+                    with self._lock:
+                        self._exceptions[label, type(e).__name__] += 1
+                    raise
+                finally:
+                    self._observe('duration', label, time.perf_counter() - start, LATENCY_BUCKETS)
+                    stack.pop()
+                    if not stack:
+                        with self._lock:
+                            self._active.pop(threading.get_ident(), None)
+
+            return wrapper
+        return decorator
+
+    def count_rows(self, input_rows=None, output_rows=None):
+        """
+        Records the rows read and produced by the instrumented call running in this thread.
+
+        Does nothing outside an instrumented call.
+
+        Args:
+        - input_rows (int): Rows the call worked from, or None if unknown (e.g. cached).
+        - output_rows (int): Rows (points, bars, table rows, ...) it returned.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if not stack:
+            return
+        if input_rows is not None:
+            self._observe('input_rows', stack[-1], input_rows, ROW_BUCKETS)
+        if output_rows is not None:
+            self._observe('output_rows', stack[-1], output_rows, ROW_BUCKETS)
+
+    def record_response(self, callback, output, body):
+        """
+        Adds the serialized response of a callback.
+
+        Args:
+        - callback (str): Name of the callback function.
+        - output (str): Output(s) of the callback (unused, responses are labelled by name).
+        - body (bytes): Plain response body.
+        """
+        if self.enabled:
+            self._observe('response_bytes', callback, len(body), BYTE_BUCKETS)
+
+    def active_calls(self):
+        """
+        Returns:
+        - dict: Thread id -> names of the instrumented calls it is running, innermost last.
+        """
+        with self._lock:
+            return {thread_id: list(stack) for thread_id, stack in self._active.items() if stack}
+
+    def render(self):
+        """
+        Returns:
+        - str: Every metric in the Prometheus text exposition format.
+        """
+        descriptions = [
+            ('duration', 'dashboard_callback_duration_seconds', 'Time spent in a callback or filter_data call.'),
+            ('input_rows', 'dashboard_callback_input_rows', 'Rows a callback or filter_data call worked from.'),
+            ('output_rows', 'dashboard_callback_output_rows', 'Rows, points or bars a callback or filter_data call returned.'),
+            ('response_bytes', 'dashboard_callback_response_bytes', 'Bytes of the serialized callback responses.'),
+        ]
+        lines = []
+        with self._lock:
+            for metric, metric_name, description in descriptions:
+                lines.append(f"# HELP {metric_name} {description}")
+                lines.append(f"# TYPE {metric_name} histogram")
+                for label, histogram in sorted(self._metrics[metric].items()):
+                    label = _escape(label)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric_name}_bucket{{callback="{label}",le="{_format_number(bound)}"}} '
+                                     f'{cumulative}')
+                    lines.append(f'{metric_name}_bucket{{callback="{label}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric_name}_sum{{callback="{label}"}} {_format_number(histogram.sum)}')
+                    lines.append(f'{metric_name}_count{{callback="{label}"}} {histogram.count}')
+
+            lines.append("# HELP dashboard_callback_exceptions_total Exceptions raised by a callback or filter_data call.")
+            lines.append("# TYPE dashboard_callback_exceptions_total counter")
+            for (label, exception), count in sorted(self._exceptions.items()):
+                lines.append(f'dashboard_callback_exceptions_total{{callback="{_escape(label)}",'
+                             f'exception="{_escape(exception)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of the instrumented calls.
+
+    A background thread looks at the stack of every thread running an instrumented call
+    (see CallbackMetrics.instrument) every interval seconds and counts the stacks it sees,
+    so the functions the callbacks spend their time in show up in proportion to that time
+    without the overhead of tracing every call. The counts are returned as collapsed
+    stacks, the input format of flame graph tools.
+
+    Args:
+    - metrics (CallbackMetrics): Metrics whose instrumented calls are sampled.
+    - interval (float): Seconds between two samples.
+    """
+
+    def __init__(self, metrics, interval=0.005):
+        self.metrics = metrics
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._control_lock = threading.Lock()
+        self._stop_event = None
+
+    def start(self):
+        """
+        Starts sampling (no effect if already started).
+        """
+        with self._control_lock:
+            if self.running:
+                return
+            # Every sampling thread gets its own stop event, so a thread stopped and replaced
+            # within one interval still exits instead of sampling next to the new one
+            self._stop_event = threading.Event()
+            threading.Thread(target=self._run, args=(self._stop_event,), name='sampling-profiler',
+                             daemon=True).start()
+
+    def stop(self):
+        """
+        Stops sampling, the counted stacks are kept.
+        """
+        with self._control_lock:
+            if self._stop_event is not None:
+                self._stop_event.set()
+
+    @property
+    def running(self):
+        return self._stop_event is not None and not self._stop_event.is_set()
+
+    def reset(self):
+        """
+        Drops the counted stacks.
+        """
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self, stop_event):
+        while not stop_event.wait(self.interval):
+            active = self.metrics.active_calls()
+            if not active:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, calls in active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    self._stacks[';'.join([calls[0]] + stack[::-1])] += 1
+                    self.samples += 1
+
+    def collapsed(self):
+        """
+        Returns:
+        - str: One 'outermost call;frame;...;innermost frame count' line per distinct stack,
+          most sampled first.
+        """
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def install_metrics(server, metrics, path='/metrics', profiler=None):
+    """
+    Function to serve the metrics of a Dash app.
+
+    The routes are not authenticated: the server must only be reachable from the internal
+    network (or the routes be filtered by the reverse proxy) when they are installed.
+
+    Args:
+    - server (flask.Flask): Server of the Dash app (app.server).
+    - metrics (CallbackMetrics): Metrics to serve.
+    - path (str): Route returning the metrics in the Prometheus text format.
+    - profiler (SamplingProfiler): Profiler to serve at path + '/profile', or None. A GET
+      returns the collapsed stacks; a POST with 'start', 'stop' or 'reset' in the query
+      string or form controls the profiler.
+
+    Returns:
+    - CallbackMetrics: metrics.
+    """
+    @server.route(path)
+    def prometheus_metrics():
+        body = metrics.render()
+        if profiler is not None:
+            body += ("# HELP dashboard_profiler_samples_total Stacks sampled by the profiler.\n"
+                     "# TYPE dashboard_profiler_samples_total counter\n"
+                     f"dashboard_profiler_samples_total {profiler.samples}\n")
+        return server.response_class(body, content_type=PROMETHEUS_CONTENT_TYPE)
+
+    if profiler is not None:
+        @server.route(path.rstrip('/') + '/profile', methods=['GET', 'POST'])
+        def profile():
+            # Only a POST changes the state of the profiler
+            if request.method == 'POST':
+                actions = set(request.args) | set(request.form)
+                if 'reset' in actions:
+                    profiler.reset()
+                if 'start' in actions:
+                    profiler.start()
+                if 'stop' in actions:
+                    profiler.stop()
+            status = 'running' if profiler.running else 'stopped'
+            body = f"# {status}, {profiler.samples} samples\n" + profiler.collapsed()
+            return server.response_class(body, mimetype='text/plain')
+
+    return metrics
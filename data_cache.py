@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+except ImportError:
+    pyarrow = None
+
+# Bump when the layout of the cached dataframe changes so that old caches are rebuilt
+CACHE_FORMAT_VERSION = 3
+
+
+def hash_file(filepath, block_size=1 << 20):
+    """
+    Function to compute a content hash of a file without loading it into memory.
+
+    Args:
+    - filepath (str): Path of the file.
+    - block_size (int): Number of bytes read at a time.
+
+    Returns:
+    - str: Hex digest of the file content.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(filepath, with_hash=True):
+    """
+    Function to describe a source file by path, size, modification time and content hash.
+
+    Args:
+    - filepath (str): Path of the file.
+    - with_hash (bool): Whether to compute the content hash (reads the whole file).
+
+    Returns:
+    - dict: Fingerprint with 'path', 'size', 'mtime_ns' and 'hash' (None if not computed).
+    """
+    stat = os.stat(filepath)
+    return {
+        'path': os.path.abspath(filepath),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': hash_file(filepath) if with_hash else None,
+    }
+
+
+def _cache_paths(cache_dir, name):
+    return os.path.join(cache_dir, f"{name}.parquet"), os.path.join(cache_dir, f"{name}.json")
+
+
+def load_cached_frame(cache_dir, name, filepath, params=None):
+    """
+    Function to load a cached dataframe if it was built from the same source file.
+
+    The cache is valid when path and size match and either the modification time matches
+    or, if only the modification time changed, the content hash still matches.
+
+    Args:
+    - cache_dir (str): Directory holding the cache files.
+    - name (str): Name of the cache slot.
+    - filepath (str): Source file the dataframe is built from.
+    - params (dict): Build parameters that must match as well (JSON serializable).
+
+    Returns:
+    - pd.DataFrame: The cached dataframe, or None if there is no valid cache.
+    """
+    if pyarrow is None:
+        return None
+    frame_path, meta_path = _cache_paths(cache_dir, name)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    cached = meta.get('source', {})
+    current = file_fingerprint(filepath, with_hash=False)
+    if (meta.get('version') != CACHE_FORMAT_VERSION or meta.get('params') != (params or {})
+            or cached.get('path') != current['path'] or cached.get('size') != current['size']):
+        return None
+    if cached.get('mtime_ns') != current['mtime_ns']:
+        # Same size but touched or copied: only reuse the cache if the content is unchanged
+        if cached.get('hash') != hash_file(filepath):
+            return None
+        meta['source']['mtime_ns'] = current['mtime_ns']
+        _write_json(meta_path, meta)
+
+    try:
+        return pd.read_parquet(frame_path)
+    except (OSError, ValueError):
+        return None
+
+
+def load_previous_build(cache_dir, name, params=None):
+    """
+    Function to load the last cached dataframe and its build state, whatever its source file.
+
+    Args:
+    - cache_dir (str): Directory holding the cache files.
+    - name (str): Name of the cache slot.
+    - params (dict): Build parameters that must match.
+
+    Returns:
+    - tuple: (pd.DataFrame, dict) of the previous build, or None if there is none.
+    """
+    if pyarrow is None:
+        return None
+    frame_path, meta_path = _cache_paths(cache_dir, name)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_FORMAT_VERSION or meta.get('params') != (params or {}):
+            return None
+        return pd.read_parquet(frame_path), meta.get('state') or {}
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_frame(cache_dir, name, filepath, df, params=None, fingerprint=None, state=None):
+    """
+    Function to store a dataframe built from filepath in the cache.
+
+    Args:
+    - cache_dir (str): Directory holding the cache files.
+    - name (str): Name of the cache slot.
+    - filepath (str): Source file the dataframe was built from.
+    - df (pd.DataFrame): Dataframe to store.
+    - params (dict): Build parameters stored alongside the fingerprint.
+    - fingerprint (dict): Fingerprint of filepath taken before the build, computed now if None.
+    - state (dict): JSON serializable build state handed to the next incremental build.
+    """
+    if pyarrow is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    frame_path, meta_path = _cache_paths(cache_dir, name)
+    meta = {
+        'version': CACHE_FORMAT_VERSION,
+        'params': params or {},
+        'source': fingerprint or file_fingerprint(filepath),
+        'state': state or {},
+    }
+    # Invalidate the slot first so a crash half-way never pairs old metadata with a new frame
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    tmp_path = frame_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, frame_path)
+    _write_json(meta_path, meta)
+
+
+def cached_build(cache_dir, name, filepath, build, params=None, incremental=False):
+    """
+    Function to return the dataframe built from filepath, reusing the cached result while the source file is unchanged.
+
+    build is called as build(filepath, previous) and returns (df, state). previous is None
+    for a full build; in incremental mode it is the (df, state) pair of the last cached build
+    when there is one, so that build only has to process what changed. Caching is skipped
+    when no Parquet engine (pyarrow) is installed.
+
+    Args:
+    - cache_dir (str): Directory holding the cache files.
+    - name (str): Name of the cache slot.
+    - filepath (str): Source file.
+    - build (callable): Function building the dataframe from filepath.
+    - params (dict): Build parameters that invalidate the cache when they change.
+    - incremental (bool): Whether to hand the previous build to build().
+
+    Returns:
+    - pd.DataFrame: The cached or freshly built dataframe.
+    """
+    df = load_cached_frame(cache_dir, name, filepath, params)
+    if df is not None:
+        print(f"Loaded preprocessed data from cache '{name}'")
+        return df
+
+    if pyarrow is None:
+        print("Warning: pyarrow is not installed, the preprocessed data will not be cached.")
+        return build(filepath, None)[0]
+
+    # Fingerprint the source before building so a file that changes meanwhile is not trusted
+    fingerprint = file_fingerprint(filepath)
+    previous = load_previous_build(cache_dir, name, params) if incremental else None
+    df, state = build(filepath, previous)
+    save_cached_frame(cache_dir, name, filepath, df, params, fingerprint, state)
+    return df
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
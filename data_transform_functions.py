@@ -1,119 +1,749 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+
+# Ordered (token, material) table, the first token found in the lower-cased item wins. A
+# token must be listed before any shorter token it contains, or it can never be matched
+MATERIAL_TOKENS = [
+    ('-yg-', 'YG'),
+    ('-rg-', 'RG'),
+    ('-wg-', 'WG'),
+    ('-ss-', 'SS'),
+    ('-ti-', 'TI'),
+    ('-nb-', 'NB'),
+    ('-sv-', 'SV'),
+    ('-br-', 'BR'),
+    ('-cop-', 'CP'),
+    ('-rb-', 'RB'),
+    ('-display-', 'acrylic'),
+    ('-nb/hm-', 'NB/HM'),
+    ('-nb/ti-', 'NB/TI'),
+    ('-nblti-', 'NB/TI'),
+    ('-nblhm-', 'NB/HM'),
+    ('-ti/rg-', 'TI/RG'),
+    ('-sgy-', 'SGY'),
+    ('-ssv-', 'SSV'),
+    ('-ggw-', 'GGW'),
+    ('-ggy-', 'GGY'),
+    ('-ggr-', 'GGR'),
+    ('-gysv-', 'GYSV'),
+    ('-oring-', 'SLC'),
+    ('-tle-', 'TLE'),
+    ('-tlepost-', 'TLE'),
+    ('-sv', 'SV'),
+    ('-ti', 'TI'),
+]
+
+# Ordered (token, length) table, matched against the lower-cased item like MATERIAL_TOKENS
+LENGTH_TOKENS = [
+    ('l7l32', '7/32'),
+    ('l1l4', '1/4'),
+    ('l9l32', '9/32'),
+    ('l5l16', '5/16'),
+    ('l11l32', '11/32'),
+    ('3l8', '3/8'),
+    ('l7l16', '7/16'),
+    ('l9l16', '9/16'),
+    ('l7l8', '7/8'),
+    ('l1 1l16', '1 1/16'),
+    ('l1 1l8', '1 1/8'),
+    ('l3l4', '3/4'),
+    ('l5l8', '5/8'),
+    ('l1l2', '1/2'),
+    ('l3l16', '3/16'),
+    ('l5l32', '5/32'),
+    ('l-1l8', '1/8'),
+    # Whole inches: the 'l1' segment, after every longer token it would shadow
+    ('-l1', '1"'),
+]
+
+
+def classify(item, token_table, default='Unknown'):
+    """
+    Function to classify a single item with an ordered token table.
+
+    Args:
+    - item (str): Item name.
+    - token_table (list): Ordered list of (token, label) pairs.
+    - default (str): Label returned when no token matches.
+
+    Returns:
+    - str: Label of the first token in the table found in the lower-cased item.
+    """
+    item = item.lower()
+    for token, label in token_table:
+        if token in item:
+            return label
+    return default
+
+
+def classify_items(items, token_table, default='Unknown'):
+    """
+    Function to classify a whole column of items with an ordered token table.
+
+    Every distinct item is classified once with classify() and the labels are mapped back
+    onto the rows by code.
+
+    Args:
+    - items (pd.Series): Item names.
+    - token_table (list): Ordered list of (token, label) pairs.
+    - default (str): Label used when no token matches (and for missing items).
+
+    Returns:
+    - pd.Series: Labels aligned with items.
+    """
+    codes, uniques = pd.factorize(items)
+    labels = np.array([classify(item, token_table, default) for item in uniques.tolist()] + [default],
+                      dtype=object)
+    # Code -1 (missing item) picks the default appended at the end
+    return pd.Series(labels[codes], index=items.index, name=items.name, dtype=object)
+
+
 # Function to extract material
 def extract_material(item):
-    if '-yg-' in item.lower():
-        return 'YG'
-    elif '-rg-' in item.lower():
-        return 'RG'
-    elif '-wg-' in item.lower():
-        return 'WG'
-    elif '-ss-' in item.lower():
-        return 'SS'
-    elif '-ti-' in item.lower():
-        return 'TI'
-    elif '-nb-' in item.lower():
-        return 'NB'
-    elif '-sv-' in item.lower():
-        return 'SV'
-    elif '-br-' in item.lower():
-        return 'BR'
-    elif '-cop-' in item.lower():
-        return 'CP'
-    elif '-rb-' in item.lower():
-        return 'RB'
-    elif '-display-' in item.lower():
-        return 'acrylic'
-    elif '-nb/hm-' in item.lower():
-        return 'NB/HM'
-    elif '-nb/ti-' in item.lower():
-        return 'NB/TI'
-    elif '-nblti-' in item.lower():
-        return 'NB/TI'
-    elif '-nblhm-' in item.lower():
-        return 'NB/HM'
-    elif '-ti/rg-' in item.lower():
-        return 'TI/RG'
-    elif '-sgy-' in item.lower():
-        return 'SGY'
-    elif '-ssv-' in item.lower():
-        return 'SSV'
-    elif '-ggw-' in item.lower():
-        return 'GGW'
-    elif '-ggy-' in item.lower():
-        return 'GGY'
-    elif '-ggr-' in item.lower():
-        return 'GGR'
-    elif '-gysv-' in item.lower():
-        return 'GYSV'
-    elif '-oring-' in item.lower():
-        return 'SLC'
-    elif '-tle-' in item.lower():
-        return 'TLE'
-    elif '-tlepost-' in item.lower():
-        return 'TLE'
-    elif '-sv' in item.lower():
-        return 'SV'
-    elif '-ti' in item.lower():
-        return 'TI'
-    else:
-        return 'Unknown'
+    return classify(item, MATERIAL_TOKENS)
 
 
 def extract_length(item):
-    if 'L7l32' in item.lower():
-        return '7/32'
-    elif 'L1l4' in item.lower():
-        return '1/4'
-    elif 'L9l32' in item.lower():
-        return '9/32'
-    elif 'L5l16' in item.lower():
-        return '5/16'
-    elif 'L11l32' in item.lower():
-        return '11/32'
-    elif '3l8' in item.lower():
-        return '3/8'
-    elif 'L7l16' in item.lower():
-        return '7/16'
-    elif 'L9l16' in item.lower():
-        return '9/16'
-    elif 'L7l8' in item.lower():
-        return '7/8'
-    elif 'L1 1l16' in item.lower():
-        return '1 1/16'
-    elif 'L1 1l8' in item.lower():
-        return '1 1/8'
-    elif 'L1' in item.lower():
-        return '1"'
-    elif 'L3l4' in item.lower():
-        return '3/4'
-    elif 'L5l8' in item.lower():
-        return '5/8'
-    elif 'L1l2' in item.lower():
-        return '1/2'
-    elif 'L3l16' in item.lower():
-        return '3/16'
-    elif 'L5l32' in item.lower():
-        return '5/32'
-    elif 'L-1l8' in item.lower():
-        return '1/8'
-    else:
-        return 'Unknown'
+    return classify(item, LENGTH_TOKENS)
 
 
-def agg_so(so):
+def parse_skus(items):
+    """
+    Function to parse every distinct SKU once into a dimension table.
+
+    Each SKU is split on '-' a single time for 'Category' (first segment) and 'Family'
+    (second segment), and classified with MATERIAL_TOKENS and LENGTH_TOKENS. 'Unknown' flags
+    SKUs whose material could not be determined.
+
+    Args:
+    - items (pd.Series): Item column of the order lines.
+
+    Returns:
+    - np.ndarray: Row code of every line into the dimension table (-1 for missing items).
+    - pd.DataFrame: Dimension table with 'Item', 'Category', 'Family', 'Material', 'Length'
+      and 'Unknown', one row per distinct item in sorted order.
+    """
+    codes, uniques = pd.factorize(items, sort=True)
+    uniques = pd.Series(uniques, dtype=object)
+    segments = uniques.str.split('-', n=2)
+    dimension = pd.DataFrame({
+        'Item': uniques,
+        'Category': segments.str[0],
+        'Family': segments.str[1],
+        'Material': classify_items(uniques, MATERIAL_TOKENS),
+        'Length': classify_items(uniques, LENGTH_TOKENS),
+    })
+    dimension['Unknown'] = dimension['Material'] == 'Unknown'
+    return codes, dimension
+
+
+def join_item_dimension(df, codes, dimension, columns):
+    """
+    Function to add dimension attributes to the order lines by row code.
+
+    The attributes are gathered as categoricals straight from the codes, so no string is
+    hashed or copied per line.
+
+    Args:
+    - df (pd.DataFrame): Order lines.
+    - codes (np.ndarray): Row codes returned by parse_skus.
+    - dimension (pd.DataFrame): Dimension table returned by parse_skus.
+    - columns (list): Dimension columns to add.
+
+    Returns:
+    - pd.DataFrame: The order lines with the requested columns set.
+    """
+    df = df.copy()
+    for col in columns:
+        attribute = dimension[col].astype('category')
+        attribute_codes = attribute.cat.codes.values
+        line_codes = np.where(codes >= 0, attribute_codes[codes], -1)
+        df[col] = pd.Categorical.from_codes(line_codes, attribute.cat.categories)
+    return df
+
+
+def classify_sales(agg_so_df):
+    """
+    Function to derive the item attributes of aggregated sales and keep the classified rows.
+
+    Every distinct 'Item' is parsed once with parse_skus and its 'Category', 'Family' and
+    'Material' are joined back onto the rows by item code; rows whose material is 'Unknown'
+    are dropped.
+
+    Args:
+    - agg_so_df (pd.DataFrame): Output of agg_so.
+
+    Returns:
+    - pd.DataFrame: 'Item', 'Category', 'Family', 'Material', 'Sales Date', 'Sales Quantity'
+      and 'Sales Amount' of the classified rows, the dimensions as categoricals.
+    - pd.DataFrame: Dimension table of the items (see parse_skus).
+    """
+    item_codes, item_dimension = parse_skus(agg_so_df['Item'])
+    agg_so_df = join_item_dimension(agg_so_df, item_codes, item_dimension, ['Item', 'Category', 'Family', 'Material'])
+
+    # Filter out rows with 'Unknown' materials
+    merged_df = agg_so_df[~item_dimension['Unknown'].values[item_codes]]
+
+    # Select relevant columns
+    # Removed 'Note' as it doesn't exist in the dataset
+    merged_df = merged_df[['Item', 'Category', 'Family', 'Material', 'Sales Date', 'Sales Quantity', 'Sales Amount']]
+    return merged_df, item_dimension
+
+
+# Columns of the sales order export used by the dashboard and how to read them
+SO_COLUMNS = ['Document Number', 'Item', 'Product Set ID', 'Date', 'Quantity', 'Amount']
+SO_DTYPES = {
+    'Document Number': str,
+    'Item': str,
+    'Product Set ID': str,
+    'Date': str,
+    'Quantity': 'float64',
+    'Amount': 'float64',
+}
+
+# Format of the 'Date' column of the export, e.g. '4/1/2024'
+SO_DATE_FORMAT = '%m/%d/%Y'
+
+# Item prefixes of the product lines shown on the dashboard
+ITEM_PREFIXES = ('BB-', 'ED-', 'JU-', 'PL-', 'NC-', 'OT-', 'RN-', 'SN-')
+
+
+def select_so_lines(so):
     # Ensure all necessary columns are of type string
-    so['Document Number'] = so['Document Number'].astype(str)
-    so['Item'] = so['Item'].astype(str)
-    so['Product Set ID'] = so['Product Set ID'].astype(str)
+    so = so.assign(**{col: so[col].astype(str) for col in ['Document Number', 'Item', 'Product Set ID']})
     # Filter for items starting with 'ED-', 'RN-', or 'BB-' or 'SN-' or 'PL-' or 'JU-' or 'NC-' or 'OT-'
-    so = so[(so["Item"].str.startswith('BB-')) |
-            (so["Item"].str.startswith('ED-')) |
-            (so["Item"].str.startswith('JU-')) |
-            (so["Item"].str.startswith('PL-')) |
-            (so["Item"].str.startswith('NC-')) |
-            (so["Item"].str.startswith('OT-')) |
-            (so["Item"].str.startswith('RN-')) |
-            (so["Item"].str.startswith('SN-'))]
-    so = so[['Item', 'Date', 'Quantity', 'Amount']]
-    agg_df = so.groupby(['Item', 'Date']).agg({'Quantity': 'sum', 'Amount': 'sum'}).reset_index()
+    return so[so["Item"].str.startswith(ITEM_PREFIXES)]
+
+
+def filter_so(so):
+    return select_so_lines(so)[['Item', 'Date', 'Quantity', 'Amount']]
+
+
+def sum_so_lines(lines):
+    agg_df = lines.groupby(['Item', 'Date']).agg({'Quantity': 'sum', 'Amount': 'sum'}).reset_index()
     agg_df.rename(columns={'Date': 'Sales Date', 'Quantity': 'Sales Quantity', 'Amount': 'Sales Amount'}, inplace=True)
     return agg_df
+
+
+def agg_so(so):
+    return sum_so_lines(filter_so(so))
+
+
+def fold_agg_so(partials):
+    """
+    Function to combine partial agg_so results into one.
+
+    Args:
+    - partials (list): DataFrames returned by agg_so.
+
+    Returns:
+    - pd.DataFrame: Sales Quantity and Sales Amount summed per ('Item', 'Sales Date').
+    """
+    combined = pd.concat(partials, ignore_index=True)
+    return combined.groupby(['Item', 'Sales Date']).agg({'Sales Quantity': 'sum', 'Sales Amount': 'sum'}).reset_index()
+
+
+def _add_partial(partials, partial, max_rows):
+    # Fold the pending partial sums together once they reach max_rows rows
+    partials.append(partial)
+    if len(partials) > 1 and sum(len(p) for p in partials) >= max_rows:
+        partials[:] = [fold_agg_so(partials)]
+
+
+def _finish_partials(partials):
+    if not partials:
+        return agg_so(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SO_DTYPES.items()}))
+    return fold_agg_so(partials) if len(partials) > 1 else partials[0]
+
+
+def parse_so_dates(dates, date_format=SO_DATE_FORMAT):
+    """
+    Function to parse the date strings of the export.
+
+    An export holds a few hundred distinct dates for millions of lines, so each distinct
+    string is parsed once with the explicit format and the results are mapped back to the
+    lines by code. Values that are already datetimes are returned as they are.
+
+    Args:
+    - dates (pd.Series): Date strings.
+    - date_format (str): strptime format of the strings.
+
+    Returns:
+    - pd.Series: datetime64 values with the index of dates (NaT for missing or unparseable dates).
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    codes, uniques = pd.factorize(dates)
+    parsed = pd.to_datetime(pd.Index(uniques, dtype=object), format=date_format, errors='coerce').values
+    # Code -1 (missing) picks the NaT appended at the end
+    parsed = np.append(parsed, np.array(['NaT'], dtype=parsed.dtype))
+    return pd.Series(parsed[codes], index=dates.index, name=dates.name)
+
+
+def iter_so_csv(filepath, min_date=None, chunksize=500_000):
+    """
+    Function to read the used columns of a sales order export chunksize rows at a time.
+
+    Args:
+    - filepath (str): Path of the exported CSV.
+    - min_date (datetime-like): Keep rows dated on or after min_date (rows whose 'Date' cannot
+      be parsed are dropped), or all rows if None.
+    - chunksize (int): Number of CSV rows parsed at a time.
+
+    Yields:
+    - pd.DataFrame: Chunk with the SO_COLUMNS, filtered on date. 'Date' keeps the strings of
+      the export.
+    """
+    for chunk in pd.read_csv(filepath, usecols=SO_COLUMNS, dtype=SO_DTYPES, chunksize=chunksize):
+        yield filter_so_dates(chunk, min_date)
+
+
+def filter_so_dates(chunk, min_date):
+    # Keep the rows dated on or after min_date (every row if min_date is None)
+    if min_date is None:
+        return chunk
+    return chunk[(parse_so_dates(chunk['Date']) >= pd.Timestamp(min_date)).values]
+
+
+def load_so_csv(filepath, min_date=None, chunksize=500_000):
+    """
+    Function to stream a sales order export into the agg_so result.
+
+    Only SO_COLUMNS are read, with explicit dtypes, chunksize rows at a time. Each chunk is
+    filtered on date and item prefix and aggregated right away; the partial sums are folded
+    together whenever they reach chunksize rows, so peak memory is bounded by the chunk size
+    and the size of the aggregate rather than by the size of the file.
+
+    Args:
+    - filepath (str): Path of the exported CSV.
+    - min_date (datetime-like): Keep rows dated on or after min_date, or all rows if None.
+    - chunksize (int): Number of CSV rows parsed at a time.
+
+    Returns:
+    - pd.DataFrame: Same result as agg_so on the filtered file.
+    """
+    partials = []
+    for chunk in iter_so_csv(filepath, min_date, chunksize):
+        _add_partial(partials, agg_so(chunk), chunksize)
+    return _finish_partials(partials)
+
+
+def read_so_lines(filepath, min_date=None, chunksize=500_000):
+    """
+    Function to read the order lines of one export, with their order number.
+
+    Unlike load_so_csv, the lines are not aggregated chunk by chunk: every selected line of
+    the file is kept in memory (and sent back in one piece when run in a worker process),
+    because lines can only be deduplicated across exports before they are summed. Memory
+    is therefore bounded by the size of the file, not by chunksize.
+
+    Args:
+    - filepath (str): Path of the exported CSV.
+    - min_date (datetime-like): Keep rows dated on or after min_date, or all rows if None.
+    - chunksize (int): Number of CSV rows parsed at a time.
+
+    Returns:
+    - pd.DataFrame: 'Document Number', 'Item', 'Date', 'Quantity' and 'Amount' of the lines
+      that pass the date and item filters.
+    - np.ndarray: Every distinct 'Document Number' of the export, including orders none of
+      whose lines passed the item filter.
+    """
+    parts = []
+    documents = []
+    for chunk in iter_so_csv(filepath, min_date, chunksize):
+        lines = select_so_lines(chunk)
+        documents.append(chunk['Document Number'].astype(str).unique())
+        parts.append(lines[['Document Number', 'Item', 'Date', 'Quantity', 'Amount']])
+    if not parts:
+        lines = pd.DataFrame(columns=['Document Number', 'Item', 'Date', 'Quantity', 'Amount'])
+        return lines, np.array([], dtype=object)
+    return pd.concat(parts, ignore_index=True), pd.unique(np.concatenate(documents))
+
+
+def dedupe_so_lines(exports):
+    """
+    Function to combine the order lines of several exports, taking each order from one export.
+
+    An order found in several exports is taken whole from the newest export that holds it,
+    so lines edited, added or removed between two exports are counted as in the newer one.
+    Lines repeated within the order are kept as many times as they appear there.
+
+    Args:
+    - exports (list): Outputs of read_so_lines, oldest export first.
+
+    Returns:
+    - pd.DataFrame: 'Item', 'Date', 'Quantity' and 'Amount' of the selected lines.
+    """
+    kept = []
+    seen = pd.Index([], dtype=object)
+    for lines, documents in reversed(exports):
+        kept.append(lines[~lines['Document Number'].isin(seen)])
+        seen = seen.append(pd.Index(documents, dtype=object))
+    lines = pd.concat(kept[::-1], ignore_index=True)
+    return lines[['Item', 'Date', 'Quantity', 'Amount']]
+
+
+def load_so_exports(filepaths, min_date=None, chunksize=500_000, workers=None):
+    """
+    Function to load several, possibly overlapping, sales order exports into one agg_so result.
+
+    The exports are parsed in parallel by a pool of worker processes, one export per task,
+    then every order is taken from the newest export holding it (see dedupe_so_lines) before
+    the lines are summed per item and day. The selected lines of all the exports are held in
+    memory at once (see read_so_lines).
+
+    Args:
+    - filepaths (list): Paths of the exported CSVs, oldest first.
+    - min_date (datetime-like): Keep rows dated on or after min_date, or all rows if None.
+    - chunksize (int): Number of CSV rows parsed at a time.
+    - workers (int): Number of worker processes (None for one per CPU, 1 to parse in this process).
+
+    Returns:
+    - pd.DataFrame: Same columns as agg_so.
+    """
+    if workers == 1 or len(filepaths) <= 1:
+        exports = [read_so_lines(filepath, min_date, chunksize) for filepath in filepaths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(filepaths))) as pool:
+            exports = list(pool.map(read_so_lines, filepaths, repeat(min_date), repeat(chunksize)))
+    if not exports:
+        return sum_so_lines(pd.DataFrame(columns=['Item', 'Date', 'Quantity', 'Amount']))
+    return sum_so_lines(dedupe_so_lines(exports))
+
+
+def hash_so_days(lines):
+    """
+    Function to fingerprint the order lines of each day.
+
+    Every line is hashed on 'Item', 'Date', 'Quantity' and 'Amount' and the hashes are summed
+    (modulo 2**64) per day, so the fingerprint does not depend on the order of the lines and
+    partial fingerprints of several chunks can simply be added up.
+
+    Args:
+    - lines (pd.DataFrame): Order lines as returned by filter_so.
+
+    Returns:
+    - pd.DataFrame: 'Row Hash' (uint64) and 'Rows' per 'Date'.
+    """
+    row_hashes = pd.util.hash_pandas_object(lines[['Item', 'Date', 'Quantity', 'Amount']], index=False)
+    hashes = pd.DataFrame({'Row Hash': row_hashes.values, 'Rows': np.ones(len(lines), dtype='int64')})
+    return hashes.groupby(lines['Date'].values).sum()
+
+
+def load_so_csv_changes(filepath, previous_day_hashes=None, min_date=None, chunksize=500_000):
+    """
+    Function to stream a sales order export and keep only the days that changed.
+
+    Works like load_so_csv and additionally fingerprints every day with hash_so_days. Days
+    whose fingerprint matches previous_day_hashes are left out of the returned aggregate, so
+    only new or changed days have to be processed downstream.
+
+    Args:
+    - filepath (str): Path of the exported CSV.
+    - previous_day_hashes (dict): {date: [row hash, rows]} of the data already processed, or
+      None to return every day.
+    - min_date (datetime-like): Keep rows dated on or after min_date, or all rows if None.
+    - chunksize (int): Number of CSV rows parsed at a time.
+
+    Returns:
+    - pd.DataFrame: agg_so result restricted to new or changed days.
+    - dict: {date: [row hash, rows]} of every day in the file.
+    - list: Previously processed days that changed or are no longer in the file.
+    """
+    partials = []
+    day_partials = []
+    for chunk in iter_so_csv(filepath, min_date, chunksize):
+        lines = filter_so(chunk)
+        day_partials.append(hash_so_days(lines))
+        _add_partial(partials, sum_so_lines(lines), chunksize)
+        if len(day_partials) > 1:
+            day_partials = [pd.concat(day_partials).groupby(level=0).sum()]
+
+    day_hashes, changed_days, stale_days = _compare_day_hashes(day_partials, previous_day_hashes)
+    return _keep_days(_finish_partials(partials), changed_days), day_hashes, stale_days
+
+
+def _compare_day_hashes(day_partials, previous_day_hashes):
+    # Sum the hash_so_days partials and compare them with the days already processed;
+    # changed_days is None when there is nothing to compare with (every day is new)
+    day_hashes = {}
+    if day_partials:
+        # tolist() keeps the exact uint64 sums, iterrows() would go through float64
+        summed = pd.concat(day_partials).groupby(level=0).sum()
+        for day, row_hash, rows in zip(summed.index, summed['Row Hash'].tolist(), summed['Rows'].tolist()):
+            day_hashes[day] = [row_hash, rows]
+
+    previous_day_hashes = previous_day_hashes or {}
+    changed_days = [day for day, value in day_hashes.items() if previous_day_hashes.get(day) != value]
+    stale_days = [day for day in previous_day_hashes if day_hashes.get(day) != previous_day_hashes[day]]
+    return day_hashes, changed_days if previous_day_hashes else None, stale_days
+
+
+def _keep_days(agg_df, days):
+    if days is None:
+        return agg_df
+    return agg_df[agg_df['Sales Date'].isin(days)].reset_index(drop=True)
+
+
+def partition_by_item(chunk, partitions):
+    """
+    Function to split order lines into partitions by a hash of their 'Item'.
+
+    All the lines of an item land in the same partition, whatever the chunk they are read
+    in, and keep their order within it.
+
+    Args:
+    - chunk (pd.DataFrame): Order lines with an 'Item' column.
+    - partitions (int): Number of partitions.
+
+    Returns:
+    - list: partitions DataFrames.
+    """
+    keys = pd.util.hash_pandas_object(chunk['Item'], index=False).values % np.uint64(partitions)
+    return [chunk[keys == partition] for partition in range(partitions)]
+
+
+# Bytes pandas treats as blank when a line holds nothing else
+_WHITESPACE = np.frombuffer(b' \t\r\n', dtype=np.uint8)
+
+
+def csv_chunk_ranges(filepath, chunksize=500_000, block_size=1 << 26):
+    """
+    Function to split a CSV file into byte ranges of chunksize rows, without parsing it.
+
+    The ranges hold the same rows as the chunks of pd.read_csv(filepath, chunksize=chunksize):
+    a row ends at a newline outside double quotes, so quoted fields may span lines, and
+    blank lines are not counted since pandas skips them. The file is memory-mapped and
+    scanned block_size bytes at a time with numpy.
+
+    Args:
+    - filepath (str): Path of the CSV file, starting with a header line.
+    - chunksize (int): Number of rows per range.
+    - block_size (int): Number of bytes scanned at a time.
+
+    Returns:
+    - bytes: Header line, with its newline.
+    - list: (start, end) byte offsets of the ranges, end excluded.
+    """
+    size = os.path.getsize(filepath)
+    data = np.memmap(filepath, dtype=np.uint8, mode='r') if size else np.zeros(0, dtype=np.uint8)
+
+    # End offset (excluded) of every non-blank line, the header line included
+    row_ends = []
+    line_start = 0
+    quotes = 0
+    for block_start in range(0, size, block_size):
+        block = data[block_start:block_start + block_size]
+        quote_at = np.flatnonzero(block == ord('"'))
+        newline_at = np.flatnonzero(block == ord('\n'))
+        # A newline ends a line when an even number of quotes comes before it
+        outside = (quotes + np.searchsorted(quote_at, newline_at)) % 2 == 0
+        quotes += len(quote_at)
+        ends = newline_at[outside] + block_start + 1
+        if len(ends):
+            starts = np.concatenate([[line_start], ends[:-1]])
+            # Lines holding only whitespace are blank; they start with whitespace or a newline
+            blank = np.isin(data[starts], _WHITESPACE)
+            for line in np.flatnonzero(blank):
+                blank[line] = not bytes(data[starts[line]:ends[line]]).strip()
+            row_ends.append(ends[~blank])
+            line_start = ends[-1]
+    if bytes(data[line_start:size]).strip():
+        # Last line without a trailing newline
+        row_ends.append(np.array([size]))
+    row_ends = np.concatenate(row_ends) if row_ends else np.zeros(0, dtype=np.int64)
+    if not len(row_ends):
+        return b'', []
+
+    header_end = int(row_ends[0])
+    header = bytes(data[:header_end])
+    if not header.endswith(b'\n'):
+        header += b'\n'
+    bounds = [header_end] + [int(end) for end in row_ends[chunksize::chunksize]]
+    if bounds[-1] != row_ends[-1] or len(bounds) == 1:
+        # The last rows, or a single empty range when there are none (pandas then returns
+        # one empty chunk)
+        bounds.append(int(row_ends[-1]) if len(row_ends) > 1 else size)
+    return header, list(zip(bounds[:-1], bounds[1:]))
+
+
+def _sum_so_range(filepath, header, start, end, min_date, partitions):
+    # Worker task: read, filter and aggregate one byte range of the export, per item partition
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    chunk = pd.read_csv(io.BytesIO(header + data), usecols=SO_COLUMNS, dtype=SO_DTYPES)
+    lines = filter_so(filter_so_dates(chunk, min_date))
+    return [(sum_so_lines(part), hash_so_days(part)) for part in partition_by_item(lines, partitions)]
+
+
+def _classify_so_partition(partials, days):
+    # Worker task: finish the aggregate of one partition and classify its items
+    return classify_sales(_keep_days(_finish_partials(partials), days))
+
+
+def load_so_csv_changes_parallel(filepath, previous_day_hashes=None, min_date=None, chunksize=500_000, workers=None):
+    """
+    Function to read, aggregate and classify a sales order export with a pool of worker processes.
+
+    The export is split into byte ranges of chunksize rows (see csv_chunk_ranges), the same
+    rows as the chunks of load_so_csv_changes. Each worker reads and parses its own ranges,
+    applies the date and item filters and aggregates the lines per item partition (see
+    partition_by_item), so only the small partial sums travel back to this process. The
+    partial sums of every partition are folded exactly when load_so_csv_changes folds them,
+    so each item's sums are added in the same order, and the finished partitions are
+    classified with classify_sales in the workers too. As an item never spans two
+    partitions, the combined result holds the same rows and values as load_so_csv_changes
+    followed by classify_sales, in another row order.
+
+    Args:
+    - filepath (str): Path of the exported CSV.
+    - previous_day_hashes (dict): {date: [row hash, rows]} of the data already processed, or
+      None to return every day.
+    - min_date (datetime-like): Keep rows dated on or after min_date, or all rows if None.
+    - chunksize (int): Number of CSV rows per range.
+    - workers (int): Number of worker processes and partitions (None for one per CPU).
+
+    Returns:
+    - pd.DataFrame: classify_sales result restricted to new or changed days.
+    - pd.DataFrame: Dimension table of the items, sorted by item.
+    - dict: {date: [row hash, rows]} of every day in the file.
+    - list: Previously processed days that changed or are no longer in the file.
+    """
+    partitions = workers or os.cpu_count()
+    header, ranges = csv_chunk_ranges(filepath, chunksize)
+    ranges = iter(ranges)
+    partials = [[] for _ in range(partitions)]
+    day_partials = []
+    with ProcessPoolExecutor(max_workers=partitions) as pool:
+        # A few ranges per worker are in flight at a time; their results are taken in file order
+        pending = deque()
+        while True:
+            while len(pending) < 2 * partitions:
+                byte_range = next(ranges, None)
+                if byte_range is None:
+                    break
+                pending.append(pool.submit(_sum_so_range, filepath, header, *byte_range, min_date, partitions))
+            if not pending:
+                break
+            for partition, (partial, days) in enumerate(pending.popleft().result()):
+                partials[partition].append(partial)
+                day_partials.append(days)
+            # Same rule as _add_partial, applied to the rows of all the partitions together
+            if len(partials[0]) > 1 and sum(len(p) for partition in partials for p in partition) >= chunksize:
+                partials = [[folded] for folded in pool.map(fold_agg_so, partials)]
+            if len(day_partials) > 1:
+                day_partials = [pd.concat(day_partials).groupby(level=0).sum()]
+
+        day_hashes, changed_days, stale_days = _compare_day_hashes(day_partials, previous_day_hashes)
+        results = list(pool.map(_classify_so_partition, partials, repeat(changed_days)))
+
+    merged_df = pd.DataFrame({
+        col: pd.api.types.union_categoricals([df[col] for df, _ in results], sort_categories=True)
+        if isinstance(results[0][0][col].dtype, pd.CategoricalDtype)
+        else np.concatenate([df[col].values for df, _ in results])
+        for col in results[0][0].columns
+    })
+    item_dimension = pd.concat([dimension for _, dimension in results]).sort_values('Item', ignore_index=True)
+    return merged_df, item_dimension, day_hashes, stale_days
+
+
+def replace_sales_days(previous, changes, stale_days):
+    """
+    Function to replace whole days of an encoded dataset with newly processed rows.
+
+    Args:
+    - previous (pd.DataFrame): Encoded dataset (see encode_sales_data).
+    - changes (pd.DataFrame): Encoded rows of the new or changed days.
+    - stale_days (list): Days (as found in the export) to drop from previous.
+
+    Returns:
+    - pd.DataFrame: Encoded dataset sorted by sort_sales_days.
+    """
+    stale = parse_so_dates(pd.Series(stale_days, dtype=object))
+    kept = previous[~previous['Sales Date'].isin(stale)]
+
+    combined = {}
+    for col in previous.columns:
+        if isinstance(previous[col].dtype, pd.CategoricalDtype):
+            combined[col] = pd.api.types.union_categoricals(
+                [kept[col], changes[col].astype('category')], sort_categories=True, ignore_order=True)
+        else:
+            combined[col] = np.concatenate([kept[col].values, changes[col].values])
+    return sort_sales_days(encode_sales_data(pd.DataFrame(combined)))
+
+
+def encode_sales_data(df, dimension_columns=('Item', 'Category', 'Family', 'Material')):
+    """
+    Function to convert the aggregated sales data into a compact columnar model.
+
+    Dimension columns become categoricals (integer codes plus one copy of each distinct
+    string), 'Sales Date' is parsed with parse_so_dates into datetime64 with an int64 'Sales Day' index (days since
+    1970-01-01), 'Sales Quantity' is stored as int32 when it only holds whole numbers and
+    'Sales Amount' as float64.
+
+    Args:
+    - df (pd.DataFrame): Aggregated sales data with 'Sales Date', 'Sales Quantity' and 'Sales Amount'.
+    - dimension_columns (tuple): Columns to store as categoricals.
+
+    Returns:
+    - pd.DataFrame: Encoded copy of the data.
+    """
+    encoded = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        if col in dimension_columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            encoded[col] = df[col].cat.remove_unused_categories()
+        elif col in dimension_columns:
+            encoded[col] = df[col].astype('category')
+        else:
+            encoded[col] = df[col]
+
+    encoded['Sales Date'] = parse_so_dates(encoded['Sales Date'])
+    encoded['Sales Day'] = encoded['Sales Date'].values.astype('datetime64[D]').astype('int64')
+
+    quantity = pd.to_numeric(encoded['Sales Quantity'], errors='coerce')
+    whole = quantity.notna().all() and (quantity % 1 == 0).all()
+    if whole and quantity.abs().max() < np.iinfo(np.int32).max:
+        encoded['Sales Quantity'] = quantity.astype('int32')
+    else:
+        encoded['Sales Quantity'] = quantity.astype('float64')
+    encoded['Sales Amount'] = pd.to_numeric(encoded['Sales Amount'], errors='coerce').astype('float64')
+    return encoded
+
+
+def sort_sales_days(df):
+    """
+    Function to order encoded sales data by 'Sales Day', then 'Item'.
+
+    Date ranges of the sorted data can be located by binary search on 'Sales Day' and
+    read as a slice instead of through a boolean mask.
+
+    Args:
+    - df (pd.DataFrame): Encoded sales data (see encode_sales_data).
+
+    Returns:
+    - pd.DataFrame: Sorted copy with a fresh RangeIndex.
+    """
+    return df.sort_values(['Sales Day', 'Item'], kind='stable').reset_index(drop=True)
+
+
+def category_codes(column, values):
+    """
+    Function to translate dimension values into the integer codes of a categorical column.
+
+    Args:
+    - column (pd.Series): Categorical column.
+    - values (iterable): Values to look up. Values that do not occur are ignored.
+
+    Returns:
+    - np.ndarray: Codes of the values present in the column's categories.
+    """
+    codes = column.cat.categories.get_indexer(list(values))
+    return codes[codes >= 0]
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from result_cache import BoundedCache
+
+
+class Dataset:
+    """
+    Snapshot of the data served by the dashboard.
+
+    A dataset is fully built before it is published through a DatasetHandle and is never
+    modified afterwards, so a callback that grabbed it keeps a consistent view even if a
+    newer dataset is swapped in meanwhile. Structures derived from the data (rollups,
+    indexes) are kept on the dataset itself and therefore go away with it.
+
+    Args:
+    - merged_df (pd.DataFrame): Encoded sales data.
+    - source (dict): Fingerprint of the report it was built from (see data_cache.file_fingerprint).
+    """
+
+    def __init__(self, merged_df, source=None):
+        self.merged_df = merged_df
+        self.source = source or {}
+        self.version = 0
+        self.loaded_at = time.time()
+        self._derived = BoundedCache(maxsize=64)
+
+    def derived(self, key, build):
+        """
+        Returns a structure derived from this dataset, building it on first use.
+
+        Args:
+        - key (hashable): Name of the structure.
+        - build (callable): Zero-argument function building it.
+
+        Returns:
+        - object: The derived structure.
+        """
+        return self._derived.get_or_compute(key, build)
+
+
+class DatasetHandle:
+    """
+    Versioned, atomically swappable reference to the current Dataset.
+
+    Args:
+    - dataset (Dataset): Initial dataset.
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def current(self):
+        """
+        Returns:
+        - Dataset: The dataset currently served.
+        """
+        return self._dataset
+
+    def swap(self, dataset):
+        """
+        Publishes a new dataset and notifies the swap listeners.
+
+        Args:
+        - dataset (Dataset): Fully built dataset, it gets the next version number.
+        """
+        with self._lock:
+            dataset.version = self._dataset.version + 1
+            self._dataset = dataset
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(dataset)
+
+    def on_swap(self, listener):
+        """
+        Registers a function called with the new dataset after every swap, typically to
+        invalidate caches derived from the previous one.
+
+        Args:
+        - listener (callable): Function taking the new Dataset.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+
+def same_source(fingerprint, other):
+    """
+    Function to tell whether two report fingerprints describe the same file version.
+    """
+    keys = ('path', 'size', 'mtime_ns')
+    return all(fingerprint.get(key) == other.get(key) for key in keys)
+
+
+def start_refresher(handle, find_source, fingerprint, load, interval):
+    """
+    Function to start a background thread that swaps in a new dataset whenever the report changes.
+
+    Every interval seconds the latest report is looked up with find_source(). When it is a
+    different file, or the same file with a new size or modification time, load() builds
+    the new dataset away from the request path and the handle swaps it in. Failures are
+    reported and the current dataset keeps being served.
+
+    Args:
+    - handle (DatasetHandle): Handle to refresh.
+    - find_source (callable): Returns the path of the latest report, or None.
+    - fingerprint (callable): Returns the fingerprint dict of a report path.
+    - load (callable): Builds a Dataset from a report path.
+    - interval (float): Seconds between two checks.
+
+    Returns:
+    - threading.Thread: The started daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                path = find_source()
+                if path is None or same_source(fingerprint(path), handle.current().source):
+                    continue
+                print(f"New sales order report detected, reloading from '{path}'")
+                handle.swap(load(path))
+            except Exception as e:
+                print(f"Warning: dataset refresh failed, keeping the current data: {e}")
+
+    thread = threading.Thread(target=run, name='dataset-refresher', daemon=True)
+    thread.start()
+    return thread
@@ -1,4 +1,162 @@
 import os
+import re
+import threading
+import time
+from datetime import date
+
+# Dates written in report filenames, e.g. '..._20240101_20241231.csv' or '...2024-01-01...'
+FILENAME_DATE_PATTERN = re.compile(r'(?<!\d)(\d{4})[-_]?(\d{2})[-_]?(\d{2})(?!\d)')
+
+
+def parse_filename_dates(filename):
+    """
+    Function to parse the date range covered by a report from its filename.
+
+    Args:
+    - filename (str): Report filename.
+
+    Returns:
+    - tuple: (start date, end date) as datetime.date. With a single date in the name both
+      are that date; (None, None) when the name holds no valid date.
+    """
+    dates = []
+    for year, month, day in FILENAME_DATE_PATTERN.findall(filename):
+        try:
+            dates.append(date(int(year), int(month), int(day)))
+        except ValueError:
+            continue
+    if not dates:
+        return None, None
+    return min(dates), max(dates)
+
+
+class ReportCatalog:
+    """
+    Index of the reports with a given prefix in a directory.
+
+    The directory is listed once with os.scandir and every matching report is recorded
+    with its size, modification and creation times and the date range parsed from its
+    name. refresh() only lists the directory again when the directory itself changed
+    (a report was added, removed or renamed). Otherwise it stats the known reports
+    again, which catches a report rewritten in place. Either way a report is only
+    described again when its size or modification time moved, and no other file of the
+    directory is looked at.
+
+    Args:
+    - directory (str): Directory holding the reports.
+    - prefix (str): Prefix of the report filenames.
+    """
+
+    def __init__(self, directory, prefix):
+        self.directory = directory
+        self.prefix = prefix
+        self._reports = {}
+        self._latest = None
+        self._directory_mtime_ns = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self, force=False):
+        """
+        Brings the catalog up to date with the directory.
+
+        Args:
+        - force (bool): Rescan even if the directory did not change.
+
+        Returns:
+        - bool: Whether the set of reports or their metadata changed.
+        """
+        try:
+            directory_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            directory_mtime_ns = None
+        reports = {}
+        if not force and directory_mtime_ns is not None and directory_mtime_ns == self._directory_mtime_ns:
+            # Same set of files: only a report rewritten in place can have changed
+            for name, known in self._reports.items():
+                try:
+                    stat = os.stat(known['path'])
+                except OSError:
+                    continue
+                reports[name] = self._update(known, name, known['path'], stat)
+        elif directory_mtime_ns is not None:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.startswith(self.prefix):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    reports[entry.name] = self._update(self._reports.get(entry.name), entry.name, entry.path, stat)
+
+        with self._lock:
+            changed = reports != self._reports
+            self._reports = reports
+            self._latest = max(reports.values(), key=lambda report: (report['ctime'], report['name']), default=None)
+            self._directory_mtime_ns = directory_mtime_ns
+        return changed
+
+    @classmethod
+    def _update(cls, known, name, path, stat):
+        # Keep the known description while the size and modification time are unchanged
+        if known is not None and (known['size'], known['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return known
+        return cls._describe(name, path, stat)
+
+    @staticmethod
+    def _describe(name, path, stat):
+        start_date, end_date = parse_filename_dates(name)
+        return {
+            'name': name,
+            'path': path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'ctime': stat.st_ctime,
+            'start_date': start_date,
+            'end_date': end_date,
+        }
+
+    def latest(self):
+        """
+        Returns:
+        - dict: Metadata of the most recently created report, or None if there is none.
+        """
+        return self._latest
+
+    def reports(self):
+        """
+        Returns:
+        - list: Metadata of every report, oldest first (by creation time).
+        """
+        with self._lock:
+            return sorted(self._reports.values(), key=lambda report: (report['ctime'], report['name']))
+
+    def watch(self, interval, on_change=None):
+        """
+        Starts a background thread that refreshes the catalog every interval seconds.
+
+        Args:
+        - interval (float): Seconds between two refreshes.
+        - on_change (callable): Called with the catalog after a refresh that found changes.
+
+        Returns:
+        - threading.Thread: The started daemon thread.
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.refresh() and on_change is not None:
+                        on_change(self)
+                except Exception as e:
+                    print(f"Warning: refreshing the report catalog of '{self.directory}' failed: {e}")
+
+        thread = threading.Thread(target=run, name='report-catalog', daemon=True)
+        thread.start()
+        return thread
 
 
 def find_latest_report(directory, prefix):
@@ -12,19 +170,5 @@ def find_latest_report(directory, prefix):
     Returns:
     - str: Filename of the latest date report with the specified prefix, or None if not found.
     """
-    latest_report = None
-    latest_creation_time = None
-
-    # Iterate through files in the directory
-    for filename in os.listdir(directory):
-        # Check if the file starts with the specified prefix
-        if filename.startswith(prefix):
-            file_path = os.path.join(directory, filename)
-            # Get the creation time of the file
-            creation_time = os.path.getctime(file_path)
-            # Update latest_report if the file creation time is later than the current latest_creation_time
-            if latest_creation_time is None or creation_time > latest_creation_time:
-                latest_creation_time = creation_time
-                latest_report = filename
-
-    return latest_report
+    latest_report = ReportCatalog(directory, prefix).latest()
+    return None if latest_report is None else latest_report['name']
@@ -0,0 +1,92 @@
+from bisect import bisect_left
+
+import numpy as np
+
+
+class ItemSearchIndex:
+    """
+    Case-insensitive search index over the item SKUs.
+
+    The upper-cased SKUs are kept sorted, so the SKUs starting with a query are one range
+    found by binary search. SKUs containing the query elsewhere are found through a
+    trigram index: the posting lists of the query's trigrams are intersected and only the
+    remaining candidates are compared with the query.
+
+    Args:
+    - items (iterable): Item SKUs, in the order of their item codes.
+    """
+
+    def __init__(self, items):
+        items = [str(item) for item in items]
+        keys = [item.upper() for item in items]
+        order = sorted(range(len(items)), key=keys.__getitem__)
+        self.items = [items[i] for i in order]
+        self.keys = [keys[i] for i in order]
+        # Item code of every position
+        self.codes = np.array(order, dtype=np.int64)
+
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for trigram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                postings.setdefault(trigram, []).append(position)
+        self.trigrams = {trigram: np.array(ids, dtype=np.int64) for trigram, ids in postings.items()}
+
+    def _prefix_range(self, query):
+        lo = bisect_left(self.keys, query)
+        hi = bisect_left(self.keys, query[:-1] + chr(ord(query[-1]) + 1), lo)
+        return lo, hi
+
+    def _containing(self, query):
+        if len(query) < 3:
+            # Too short for a trigram, scan the keys
+            return [position for position, key in enumerate(self.keys) if query in key]
+        candidates = None
+        for trigram in sorted({query[i:i + 3] for i in range(len(query) - 2)},
+                              key=lambda trigram: len(self.trigrams.get(trigram, ()))):
+            ids = self.trigrams.get(trigram)
+            if ids is None:
+                return []
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return []
+        # Trigrams can match in a different order than the query, check the candidates
+        return [position for position in candidates.tolist() if query in self.keys[position]]
+
+    def search(self, query, limit, allowed=None):
+        """
+        Returns the SKUs matching a query, best matches first.
+
+        SKUs starting with the query come first, then SKUs containing it elsewhere, each
+        group in alphabetical order.
+
+        Args:
+        - query (str): Text typed in the dropdown (case-insensitive); empty matches everything.
+        - limit (int): Maximum number of SKUs returned.
+        - allowed (np.ndarray): Boolean mask over the item codes restricting the result, or None.
+
+        Returns:
+        - list: Matching SKUs.
+        """
+        query = (query or '').upper()
+        if not query:
+            lo, hi = 0, len(self.keys)
+        else:
+            lo, hi = self._prefix_range(query)
+        matches = self._allowed(np.arange(lo, hi), allowed, limit)
+        if query and len(matches) < limit:
+            others = np.array([position for position in self._containing(query) if not lo <= position < hi],
+                              dtype=np.int64)
+            matches += self._allowed(others, allowed, limit - len(matches))
+        return [self.items[position] for position in matches]
+
+    def _allowed(self, positions, allowed, limit):
+        if allowed is not None:
+            positions = positions[allowed[self.codes[positions]]]
+        return positions[:limit].tolist()
+
+
+def item_search_index(dataset):
+    """
+    Function to return the item search index of a dataset, building it once.
+    """
+    return dataset.derived('item_search', lambda: ItemSearchIndex(dataset.merged_df['Item'].cat.categories))
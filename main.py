@@ -1,500 +1,734 @@
+import os
+
 import pandas as pd
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import MissingCallbackContextException
 import plotly.graph_objs as go
 from dash import dash_table
-from get_latest_file import find_latest_report
-from data_transform_functions import extract_material, agg_so
+
+# Optional: install with `pip install flask-compress` (or `pip install "dash[compress]"`)
+try:
+    import flask_compress  # noqa: F401  (used by Dash to compress responses)
+except ImportError:
+    flask_compress = None
+
+from get_latest_file import ReportCatalog
+from data_transform_functions import (load_so_csv_changes, load_so_csv_changes_parallel, load_so_exports,
+                                      classify_sales, encode_sales_data, replace_sales_days, sort_sales_days)
+from result_cache import BoundedCache
+from data_cache import cached_build, file_fingerprint
+from dataset import Dataset, DatasetHandle, start_refresher
+from sales_query import build_query_tables, query_sales, dimension_totals, top_k, bucket_totals, dimension_index
+from table_query import table_columns, filter_table, sort_table, table_page
+from scatter_query import reduce_scatter
+from item_search import item_search_index
+from figure_encoding import typed_dates, axis_values, compact_template
+from response_stats import ResponseStats, install_response_stats, measure_callback_responses
+from callback_metrics import CallbackMetrics, SamplingProfiler, install_metrics
 
 # -------------------------------
 # Configuration
 # -------------------------------
 
-DOWNLOAD_FOLDER_PATH = "C:/Users/hank.aungkyaw/Downloads"
+# Folders can be overridden through the environment (e.g. by the benchmarks)
+DOWNLOAD_FOLDER_PATH = os.environ.get('SALES_DOWNLOAD_FOLDER', "C:/Users/hank.aungkyaw/Downloads")
 SO_PREFIX = "SalesOrder1yearSalesOnlyHKResults906"
+# Order lines dated before this day are left out while the report is read
+SO_MIN_DATE = pd.Timestamp(os.environ.get('SALES_MIN_DATE', '2024-04-01'))
+
+# Number of CSV rows parsed at a time while loading the sales order report
+SO_CHUNK_SIZE = 500_000
+
+# Folder holding the preprocessed copy of the latest report
+CACHE_FOLDER_PATH = os.environ.get('SALES_CACHE_FOLDER',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# Worker processes reading, filtering, aggregating and classifying the latest report, each
+# one parsing its own byte ranges of the file (1: in this process, None: one per CPU)
+PREPROCESS_WORKERS = 1
+
+# Re-process only the days that changed since the cached build when a new report lands
+INCREMENTAL_LOAD = True
+
+# Load every report of the download folder instead of only the latest one, to cover the
+# history of several overlapping exports; an order found in more than one report is taken
+# from the newest report holding it
+LOAD_ALL_REPORTS = False
+
+# Worker processes parsing the reports when LOAD_ALL_REPORTS is set (None: one per CPU)
+LOAD_WORKERS = None
+
+# Date cutoff (a pd.Timestamp) applied instead of SO_MIN_DATE when LOAD_ALL_REPORTS is
+# set; None keeps the whole history covered by the reports
+ALL_REPORTS_MIN_DATE = None
+
+# Seconds between two checks for a newer report (0 disables the background refresh)
+REFRESH_INTERVAL_SECONDS = int(os.environ.get('SALES_REFRESH_INTERVAL', 300))
+
+# Number of distinct filter selections whose filtered result is kept in memory
+FILTER_CACHE_SIZE = 32
+
+# Maximum number of markers sent to the scatter plot (the largest ones are kept)
+SCATTER_MAX_POINTS = 5000
+
+# Marker count above which the scatter plot is drawn with WebGL (Scattergl)
+SCATTER_GL_THRESHOLD = 1000
+
+# Number of matching items offered per keystroke in the Item dropdown
+ITEM_SEARCH_LIMIT = 50
+
+# Measure the size of every callback response, served as JSON at /_response-stats
+MEASURE_RESPONSE_SIZES = False
+
+# Record the latency, row counts and response sizes of the callbacks and filter_data,
+# served in the Prometheus text format at /metrics. The diagnostic routes are not
+# authenticated: only expose the server to the internal network with them enabled
+COLLECT_METRICS = True
+
+# Sample the stacks of the running callbacks for hot-path analysis, served as collapsed
+# stacks at /metrics/profile (needs COLLECT_METRICS)
+PROFILE_CALLBACKS = False
+
+# Sales cards shown next to the total, one per bucket of materials. A bucket without
+# materials collects every material not listed in another bucket.
+SALES_CARD_BUCKETS = [
+    {'id': 'ss-sales-amount', 'title': 'Steel Sales', 'color': '#ff7f0e', 'materials': ['SS']},
+    {'id': 'ti-sales-amount', 'title': 'Titanium Sales', 'color': '#2ca02c', 'materials': ['TI']},
+    {'id': 'nb-sales-amount', 'title': 'Niobium Sales', 'color': '#d62728', 'materials': ['NB']},
+    {'id': 'gold-sales-amount', 'title': 'Gold Sales', 'color': '#9467bd', 'materials': ['RG', 'WG', 'YG']},
+    {'id': 'others-sales-amount', 'title': 'Others Sales', 'color': '#8c564b', 'materials': None},
+]
 
 # -------------------------------
 # Data Loading and Preprocessing
 # -------------------------------
 
-# Load the latest sales order report
-so_filename = find_latest_report(DOWNLOAD_FOLDER_PATH, SO_PREFIX)
-if so_filename is None:
-    raise FileNotFoundError(f"No file found with prefix '{SO_PREFIX}' in '{DOWNLOAD_FOLDER_PATH}'")
+def build_merged_df(so_filepath, previous=None):
+    """
+    Builds the dashboard dataset from a sales order report.
 
-# Construct the full file path and load the data with low_memory=False to suppress DtypeWarnings
-so_filepath = f"{DOWNLOAD_FOLDER_PATH}/{so_filename}"
-so = pd.read_csv(so_filepath, low_memory=False)
-so = so[so["Date"] >= "4/1/2024"]
+    Parameters:
+        so_filepath (str): Path of the sales order CSV export.
+        previous (tuple): (merged_df, state) of an earlier build. Only the days whose order
+            lines changed since then are re-processed.
 
-# Print out the first few rows to verify data loading
-print("Loaded Sales Order Data:")
-print(so.head())
+    Returns:
+        pd.DataFrame: Encoded sales data (see encode_sales_data).
+        dict: Build state with the per-day fingerprints of the report.
+    """
+    previous_df, previous_state = previous if previous is not None else (None, {})
+
+    # Stream the needed columns through the date and item filters and the agg_so
+    # aggregation, one chunk at a time, keeping only new or changed days
+    if PREPROCESS_WORKERS == 1:
+        agg_so_df, day_hashes, stale_days = load_so_csv_changes(
+            so_filepath, previous_state.get('day_hashes'), min_date=SO_MIN_DATE, chunksize=SO_CHUNK_SIZE)
+        classified_df, item_dimension = classify_sales(agg_so_df)
+    else:
+        # Same result, with the read, filter, aggregate and classify steps run in worker
+        # processes
+        classified_df, item_dimension, day_hashes, stale_days = load_so_csv_changes_parallel(
+            so_filepath, previous_state.get('day_hashes'), min_date=SO_MIN_DATE, chunksize=SO_CHUNK_SIZE,
+            workers=PREPROCESS_WORKERS)
+
+    # Print out the first few rows to verify data loading
+    print("Loaded Sales Order Data:")
+    print(classified_df.head())
+    if previous_df is not None:
+        print(f"Incremental load: {len(stale_days)} stale and "
+              f"{classified_df['Sales Date'].nunique()} new or changed days")
+
+    merged_df = encode_merged_df(classified_df, item_dimension)
+    if previous_df is not None:
+        merged_df = replace_sales_days(previous_df, merged_df, stale_days)
+    return merged_df, {'day_hashes': day_hashes}
+
+
+def build_merged_df_from_reports(so_filepath, previous=None):
+    """
+    Builds the dashboard dataset from every sales order report of the download folder.
 
-# Aggregate sales order data using the provided agg_so function
-agg_so_df = agg_so(so)
+    Parameters:
+        so_filepath (str): Path of the latest report (the others are taken from so_catalog).
+        previous (tuple): Unused, the reports are always processed in full.
 
-# Extract 'Category', 'Family', and 'Material' from the 'Item' column
-agg_so_df['Category'] = agg_so_df['Item'].str.split('-').str[0]
-agg_so_df['Family'] = agg_so_df['Item'].str.split('-').str[1]
-agg_so_df['Material'] = agg_so_df['Item'].apply(extract_material)
+    Returns:
+        pd.DataFrame: Encoded sales data (see encode_sales_data).
+        dict: Empty build state.
+    """
+    # Oldest report first, as load_so_exports takes each order from the newest one holding it
+    so_filepaths = [report['path'] for report in so_catalog.reports()]
+    print(f"Loading {len(so_filepaths)} sales order reports")
+    agg_so_df = load_so_exports(so_filepaths, ALL_REPORTS_MIN_DATE, SO_CHUNK_SIZE, LOAD_WORKERS)
+    return prepare_merged_df(agg_so_df), {}
 
-# Print unique values to verify extraction
-print("Unique Categories:", agg_so_df['Category'].unique())
-print("Unique Families:", agg_so_df['Family'].unique())
-print("Unique Materials:", agg_so_df['Material'].unique())
 
-# Filter out rows with 'Unknown' materials
-merged_df = agg_so_df[agg_so_df['Material'] != 'Unknown']
+def prepare_merged_df(agg_so_df):
+    """
+    Derives the item attributes and encodes the aggregated sales order data.
 
-# Select relevant columns
-# Removed 'Note' as it doesn't exist in the dataset
-merged_df = merged_df[['Item', 'Category', 'Family', 'Material', 'Sales Date', 'Sales Quantity', 'Sales Amount']]
+    Parameters:
+        agg_so_df (pd.DataFrame): Output of agg_so.
 
-# Parse 'Sales Date' into datetime format, handle errors with 'coerce'
-merged_df['Sales Date'] = pd.to_datetime(merged_df['Sales Date'], errors='coerce')
+    Returns:
+        pd.DataFrame: Encoded sales data (see encode_sales_data).
+    """
+    # Parse every distinct 'Item' once into 'Category', 'Family', 'Material' and 'Length',
+    # join the attributes back onto the aggregated rows and drop the 'Unknown' materials
+    return encode_merged_df(*classify_sales(agg_so_df))
+
+
+def encode_merged_df(merged_df, item_dimension):
+    """
+    Encodes the classified sales order data.
 
-# Check for any NaT values after parsing
-if merged_df['Sales Date'].isna().any():
-    print("Warning: Some 'Sales Date' entries could not be parsed and are set as NaT.")
+    Parameters:
+        merged_df (pd.DataFrame): Classified rows (see classify_sales).
+        item_dimension (pd.DataFrame): Dimension table of the items.
+
+    Returns:
+        pd.DataFrame: Encoded sales data (see encode_sales_data).
+    """
+    # Print unique values to verify extraction
+    print("Unique Categories:", item_dimension['Category'].unique())
+    print("Unique Families:", item_dimension['Family'].unique())
+    print("Unique Materials:", item_dimension['Material'].unique())
+
+    # Build the compact model: categorical dimensions, parsed 'Sales Date' (unparseable
+    # entries become NaT) with an int64 'Sales Day' index, and narrow measure columns
+    merged_df = encode_sales_data(merged_df)
+
+    # Check for any NaT values after parsing
+    if merged_df['Sales Date'].isna().any():
+        print("Warning: Some 'Sales Date' entries could not be parsed and are set as NaT.")
+
+    # Keep the rows ordered by day so date ranges can be sliced by binary search, in the
+    # same order as replace_sales_days so an incremental build equals a full one
+    return sort_sales_days(merged_df)
+
+
+# Sales order reports of the download folder, re-listed only when the folder changes
+so_catalog = ReportCatalog(DOWNLOAD_FOLDER_PATH, SO_PREFIX)
+
+
+def find_latest_so_filepath():
+    """
+    Returns:
+        str: Full path of the latest sales order report, or None if there is none.
+    """
+    so_catalog.refresh()
+    latest_report = so_catalog.latest()
+    return None if latest_report is None else f"{DOWNLOAD_FOLDER_PATH}/{latest_report['name']}"
+
+
+def load_dataset(so_filepath):
+    """
+    Loads the preprocessed data of a report, reusing the cached copy while the report is
+    unchanged.
+
+    Parameters:
+        so_filepath (str): Path of the sales order CSV export.
+
+    Returns:
+        Dataset: The loaded dataset.
+    """
+    # Fingerprint first so that a report rewritten during the load is picked up again later
+    source = file_fingerprint(so_filepath, with_hash=False)
+    if LOAD_ALL_REPORTS:
+        # The cache is only valid for the same set of reports
+        reports = [[report['name'], report['size'], report['mtime_ns']] for report in so_catalog.reports()]
+        min_date = None if ALL_REPORTS_MIN_DATE is None else ALL_REPORTS_MIN_DATE.isoformat()
+        merged_df = cached_build(CACHE_FOLDER_PATH, SO_PREFIX + '-all', so_filepath, build_merged_df_from_reports,
+                                 params={'min_date': min_date, 'reports': reports})
+    else:
+        merged_df = cached_build(CACHE_FOLDER_PATH, SO_PREFIX, so_filepath, build_merged_df,
+                                 params={'min_date': SO_MIN_DATE.isoformat()}, incremental=INCREMENTAL_LOAD)
+    dataset = Dataset(merged_df, source)
+
+    # Index the daily rows and pre-aggregate the Daily/Weekly/Monthly/Yearly rollups the
+    # filters are answered from
+    build_query_tables(dataset)
+    item_search_index(dataset)
+    return dataset
+
+
+if __name__ == '__mp_main__':
+    # Worker process of the parallel report loader: on Windows and macOS workers import this
+    # script again before running the parsing functions, they must not load the data too
+    dataset_handle = DatasetHandle(Dataset(pd.DataFrame(columns=['Item', 'Category', 'Family', 'Material',
+                                                                 'Sales Date', 'Sales Quantity', 'Sales Amount'])))
+else:
+    # Load the latest sales order report
+    so_filepath = find_latest_so_filepath()
+    if so_filepath is None:
+        raise FileNotFoundError(f"No file found with prefix '{SO_PREFIX}' in '{DOWNLOAD_FOLDER_PATH}'")
+
+    # Callbacks and the layout read the data through this handle; a background refresher
+    # swaps in a new dataset whenever a newer report lands
+    dataset_handle = DatasetHandle(load_dataset(so_filepath))
+    if REFRESH_INTERVAL_SECONDS:
+        start_refresher(dataset_handle, find_latest_so_filepath, lambda path: file_fingerprint(path, with_hash=False),
+                        load_dataset, REFRESH_INTERVAL_SECONDS)
 
 # -------------------------------
 # Initialize Dash App
 # -------------------------------
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Responses are gzip-compressed when the optional flask-compress package is installed
+if flask_compress is None:
+    print("Warning: flask-compress is not installed, responses will not be compressed "
+          "(pip install flask-compress).")
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=flask_compress is not None)
 app.title = "Sales Analysis Dashboard"
 
-# -------------------------------
-# Define Dropdown Options
-# -------------------------------
+# Objects recording every callback response, fed by a single hook
+response_recorders = []
+if MEASURE_RESPONSE_SIZES:
+    response_recorders.append(install_response_stats(app.server, ResponseStats()))
 
-category_options = [{'label': name, 'value': name} for name in sorted(merged_df['Category'].unique())]
-family_options = [{'label': name, 'value': name} for name in sorted(merged_df['Family'].unique())]
-material_options = [{'label': name, 'value': name} for name in sorted(merged_df['Material'].unique())]
-item_options = [{'label': name, 'value': name} for name in sorted(merged_df['Item'].unique())]
+# Metrics of the callbacks; the profiler samples from startup and can be stopped, restarted
+# and reset with a POST to /metrics/profile?stop, ?start or ?reset
+metrics = CallbackMetrics(enabled=COLLECT_METRICS)
+if COLLECT_METRICS:
+    profiler = SamplingProfiler(metrics) if PROFILE_CALLBACKS else None
+    install_metrics(app.server, metrics, profiler=profiler)
+    if profiler is not None:
+        profiler.start()
+    response_recorders.append(metrics)
+
+if response_recorders:
+    measure_callback_responses(app, response_recorders)
+
+# Template of every figure, reduced to the trace types drawn by the dashboard
+FIGURE_TEMPLATE = compact_template('plotly_white', ['bar', 'scatter', 'scattergl'])
 
 # -------------------------------
 # Define App Layout
 # -------------------------------
 
-app.layout = dbc.Container([
-    # Title
-    html.H1("Sales Analysis Dashboard", style={'marginBottom': '40px', 'textAlign': 'center'}),
-
-    # -------------------------------
-    # Total Sales Amount and Additional Cards
-    # -------------------------------
-    # Added section to display the total sales amount and five additional sales metrics
-    dbc.Row([
-        # Total Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#1f77b4',
-                    'padding': '20px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H2(
-                        children='Total Sales',
-                        style={'marginBottom': '10px'}
-                    ),
-                    html.H1(
-                        id='total-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=2),  # Adjusted width for the main card
-
-        # SS Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#ff7f0e',
-                    'padding': '15px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H4(
-                        children='Steel Sales',
-                        style={'marginBottom': '5px'}
-                    ),
-                    html.H5(
-                        id='ss-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=1),
-
-        # TI Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#2ca02c',
-                    'padding': '15px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H4(
-                        children='Titanium Sales',
-                        style={'marginBottom': '5px'}
-                    ),
-                    html.H5(
-                        id='ti-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=1),
-
-        # NB Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#d62728',
-                    'padding': '15px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H4(
-                        children='Niobium Sales',
-                        style={'marginBottom': '5px'}
-                    ),
-                    html.H5(
-                        id='nb-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=1),
-
-        # Gold Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#9467bd',
-                    'padding': '15px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H4(
-                        children='Gold Sales',
-                        style={'marginBottom': '5px'}
-                    ),
-                    html.H5(
-                        id='gold-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=1),
-
-        # Others Sales Amount Card
-        dbc.Col([
-            html.Div(
-                style={
-                    'backgroundColor': '#8c564b',
-                    'padding': '15px',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'color': '#ffffff',
-                    'marginBottom': '20px'
-                },
-                children=[
-                    html.H4(
-                        children='Others Sales',
-                        style={'marginBottom': '5px'}
-                    ),
-                    html.H5(
-                        id='others-sales-amount',
-                        children='$0.00',
-                        style={'margin': '0'}
-                    )
-                ]
-            )
-        ], width=1)
-    ], justify='center'),  # Centers the row
-
-    # Filter Controls
-    dbc.Row([
-        dbc.Col(
-            html.Div([html.Link(rel='stylesheet', href='/assets/styles.css')],
-                     style={'paddingBottom': '100px'}),
-            md=6  # Set the column width to 6 for half of the screen
-        ),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(
-                    html.H3("Filters", className='blue-table-header'),
-                    className='blue-table'  # Apply the same custom styles
+# Layout per date range of the data, rebuilt only when a new dataset changes the range
+layout_cache = BoundedCache(maxsize=1)
+
+
+def serve_layout():
+    """
+    Serves the page layout for the current dataset.
+
+    The layout only carries the date range of the data; the dropdown options, the table
+    rows and the figures are filled by callbacks once the page is mounted, so the first
+    response has the same size whatever the size of the dataset.
+    """
+    dataset = dataset_handle.current()
+    date_range = dataset.derived('date_range', lambda: (dataset.merged_df['Sales Date'].min(),
+                                                        dataset.merged_df['Sales Date'].max()))
+    return layout_cache.get_or_compute(date_range, lambda: build_layout(*date_range))
+
+
+def build_sales_card(bucket):
+    """
+    Builds the card showing the sales amount of one material bucket.
+
+    Parameters:
+        bucket (dict): Entry of SALES_CARD_BUCKETS.
+
+    Returns:
+        dbc.Col: The card.
+    """
+    return dbc.Col([
+        html.Div(
+            style={
+                'backgroundColor': bucket['color'],
+                'padding': '15px',
+                'borderRadius': '10px',
+                'textAlign': 'center',
+                'color': '#ffffff',
+                'marginBottom': '20px'
+            },
+            children=[
+                html.H4(
+                    children=bucket['title'],
+                    style={'marginBottom': '5px'}
                 ),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            # Date Range Picker
-                            dbc.Row([
-                                dbc.Col([
-                                    dcc.DatePickerRange(
-                                        id='date-picker-range',
-                                        start_date=merged_df['Sales Date'].min(),
-                                        end_date=merged_df['Sales Date'].max(),
-                                        display_format='MM/DD/YYYY',
-                                        style={'margin-top': '10px'}
-                                    )
-                                ]),
-                                dbc.Col([
-                                    html.Label('Time Format'),
-                                    dcc.RadioItems(
-                                        id='type-filter',  # Changed ID to 'type-filter' as per user request
-                                        options=[
-                                            {'label': 'Daily', 'value': 'D'},
-                                            {'label': 'Weekly', 'value': 'W'},
-                                            {'label': 'Monthly', 'value': 'M'},
-                                            {'label': 'Yearly', 'value': 'Y'}
-                                        ],
-                                        value='M',  # Default value
-                                        labelStyle={'display': 'inline-block', 'margin-right': '15px'}
-                                    )
-                                ]),
-                                dbc.Col([
-                                    html.Label('Sort'),
-                                    dcc.RadioItems(
-                                        id='sort-order-radio',
-                                        options=[
-                                            {'label': 'Ascending', 'value': 'asc'},
-                                            {'label': 'Descending', 'value': 'desc'}
-                                        ],
-                                        value='desc',
-                                        labelStyle={'display': 'inline-block', 'margin-right': '15px'}
-                                    )
-                                ])
-                            ], style={'marginBottom': '20px'}),
+                html.H5(
+                    id=bucket['id'],
+                    children='$0.00',
+                    style={'margin': '0'}
+                )
+            ]
+        )
+    ], width=1)
 
-                            # Dropdowns for Item, Category, Family, Material
-                            dbc.Row([
-                                dbc.Col(
-                                    dcc.Dropdown(
-                                        id='item-dropdown',
-                                        options=item_options,
-                                        multi=True,
-                                        placeholder='Filter by Item',
-                                    ),
-                                    width=6
-                                ),
-                                dbc.Col(
-                                    dcc.Dropdown(
-                                        id='category-dropdown',
-                                        options=category_options,
-                                        multi=True,
-                                        placeholder='Filter by Category',
-                                    ),
-                                    width=6
-                                )
-                            ], style={'marginBottom': '10px'}),
 
-                            dbc.Row([
-                                dbc.Col(
-                                    dcc.Dropdown(
-                                        id='family-dropdown',
-                                        options=family_options,
-                                        multi=True,
-                                        placeholder='Filter by Family',
+def build_layout(start_date, end_date):
+    """
+    Builds the page layout.
+
+    Parameters:
+        start_date (pd.Timestamp): First sales date of the data, selected initially.
+        end_date (pd.Timestamp): Last sales date of the data, selected initially.
+
+    Returns:
+        dbc.Container: The page layout.
+    """
+    return dbc.Container([
+        # Title
+        html.H1("Sales Analysis Dashboard", style={'marginBottom': '40px', 'textAlign': 'center'}),
+
+        # -------------------------------
+        # Total Sales Amount and Additional Cards
+        # -------------------------------
+        # Added section to display the total sales amount and five additional sales metrics
+        dbc.Row([
+            # Total Sales Amount Card
+            dbc.Col([
+                html.Div(
+                    style={
+                        'backgroundColor': '#1f77b4',
+                        'padding': '20px',
+                        'borderRadius': '10px',
+                        'textAlign': 'center',
+                        'color': '#ffffff',
+                        'marginBottom': '20px'
+                    },
+                    children=[
+                        html.H2(
+                            children='Total Sales',
+                            style={'marginBottom': '10px'}
+                        ),
+                        html.H1(
+                            id='total-sales-amount',
+                            children='$0.00',
+                            style={'margin': '0'}
+                        )
+                    ]
+                )
+            ], width=2),  # Adjusted width for the main card
+
+            # One card per material bucket (see SALES_CARD_BUCKETS)
+            *[build_sales_card(bucket) for bucket in SALES_CARD_BUCKETS]
+        ], justify='center'),  # Centers the row
+
+        # Filter Controls
+        dbc.Row([
+            dbc.Col(
+                html.Div([html.Link(rel='stylesheet', href='/assets/styles.css')],
+                         style={'paddingBottom': '100px'}),
+                md=6  # Set the column width to 6 for half of the screen
+            ),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(
+                        html.H3("Filters", className='blue-table-header'),
+                        className='blue-table'  # Apply the same custom styles
+                    ),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                # Date Range Picker
+                                dbc.Row([
+                                    dbc.Col([
+                                        dcc.DatePickerRange(
+                                            id='date-picker-range',
+                                            start_date=start_date,
+                                            end_date=end_date,
+                                            display_format='MM/DD/YYYY',
+                                            style={'margin-top': '10px'}
+                                        )
+                                    ]),
+                                    dbc.Col([
+                                        html.Label('Time Format'),
+                                        dcc.RadioItems(
+                                            id='type-filter',  # Changed ID to 'type-filter' as per user request
+                                            options=[
+                                                {'label': 'Daily', 'value': 'D'},
+                                                {'label': 'Weekly', 'value': 'W'},
+                                                {'label': 'Monthly', 'value': 'M'},
+                                                {'label': 'Yearly', 'value': 'Y'}
+                                            ],
+                                            value='M',  # Default value
+                                            labelStyle={'display': 'inline-block', 'margin-right': '15px'}
+                                        )
+                                    ]),
+                                    dbc.Col([
+                                        html.Label('Sort'),
+                                        dcc.RadioItems(
+                                            id='sort-order-radio',
+                                            options=[
+                                                {'label': 'Ascending', 'value': 'asc'},
+                                                {'label': 'Descending', 'value': 'desc'}
+                                            ],
+                                            value='desc',
+                                            labelStyle={'display': 'inline-block', 'margin-right': '15px'}
+                                        )
+                                    ])
+                                ], style={'marginBottom': '20px'}),
+
+                                # Dropdowns for Item, Category, Family, Material
+                                dbc.Row([
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id='item-dropdown',
+                                            # Searched on the server by update_item_options
+                                            options=[],
+                                            multi=True,
+                                            placeholder='Filter by Item',
+                                        ),
+                                        width=6
                                     ),
-                                    width=6
-                                ),
-                                dbc.Col(
-                                    dcc.Dropdown(
-                                        id='material-dropdown',
-                                        options=material_options,
-                                        multi=True,
-                                        placeholder='Filter by Material',
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id='category-dropdown',
+                                            # Filled by update_category_options
+                                            options=[],
+                                            multi=True,
+                                            placeholder='Filter by Category',
+                                        ),
+                                        width=6
+                                    )
+                                ], style={'marginBottom': '10px'}),
+
+                                dbc.Row([
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id='family-dropdown',
+                                            # Filled by update_family_options
+                                            options=[],
+                                            multi=True,
+                                            placeholder='Filter by Family',
+                                        ),
+                                        width=6
                                     ),
-                                    width=6
-                                )
-                            ], style={'marginBottom': '10px'}),
-
-                        ], style={'padding': '10px', 'backgroundColor': '#E4E5E5'})
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id='material-dropdown',
+                                            # Filled by update_material_options
+                                            options=[],
+                                            multi=True,
+                                            placeholder='Filter by Material',
+                                        ),
+                                        width=6
+                                    )
+                                ], style={'marginBottom': '10px'}),
+
+                            ], style={'padding': '10px', 'backgroundColor': '#E4E5E5'})
+                        ]),
+                    ])
+                ], className='light-blue-table')  # Apply custom card style
+            ], width=12)
+        ], style={'paddingBottom': '30px'}),
+
+
+        # Plots
+        dbc.Row([
+            dbc.Col(
+                html.Div([html.Link(rel='stylesheet', href='/assets/styles.css')],
+                         style={'paddingBottom': '100px'}),
+                md=6  # Set the column width to 6 for half of the screen
+            ),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(
+                        html.H3("Plots", className='blue-table-header'),
+                        className='blue-table'  # Apply the same custom styles
+                    ),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                dcc.Graph(id='time-series-plot')
+                            ], width=12)
+                        ], style={'marginTop': '10px'}),
                     ]),
-                ])
-            ], className='light-blue-table')  # Apply custom card style
-        ], width=12)
-    ], style={'paddingBottom': '30px'}),
-
-
-    # Plots
-    dbc.Row([
-        dbc.Col(
-            html.Div([html.Link(rel='stylesheet', href='/assets/styles.css')],
-                     style={'paddingBottom': '100px'}),
-            md=6  # Set the column width to 6 for half of the screen
-        ),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(
-                    html.H3("Plots", className='blue-table-header'),
-                    className='blue-table'  # Apply the same custom styles
-                ),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            dcc.Graph(id='time-series-plot')
-                        ], width=12)
-                    ], style={'marginTop': '10px'}),
-                ]),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            dcc.Graph(id='item-bar-plot')
-                        ], width=8),
-                        dbc.Col([
-                            dcc.Graph(id='category-bar-plot')
-                        ], width=4)
-                    ], style={'marginTop': '10px'}),
-                ]),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            dcc.Graph(id='family-bar-plot')
-                        ], width=8),
-                        dbc.Col([
-                            dcc.Graph(id='material-bar-plot')
-                        ], width=4)
-                    ], style={'marginTop': '10px'}),
-                ]),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label('Time Format'),
-                            dcc.RadioItems(
-                                id='scatter-type-filter',  # Changed ID to 'type-filter' as per user request
-                                options=[
-                                    {'label': 'Daily', 'value': 'D'},
-                                    {'label': 'Weekly', 'value': 'W'},
-                                    {'label': 'Monthly', 'value': 'M'},
-                                    {'label': 'Yearly', 'value': 'Y'}
-                                ],
-                                value='D',  # Default value
-                                labelStyle={'display': 'inline-block', 'margin-right': '15px'}
-                            )
-                        ], width=4),
-                        dbc.Col([
-                            html.Label('Size'),
-                            dcc.RadioItems(
-                                id='scatter-size-filter',  # Changed ID to 'type-filter' as per user request
-                                options=[
-                                    {'label': 'Sales Amount', 'value': 'Sales Amount'},
-                                    {'label': 'Sales Quantity', 'value': 'Sales Quantity'},
-                                ],
-                                value='Sales Amount',  # Default value
-                                labelStyle={'display': 'inline-block', 'margin-right': '15px'}
-                            )
-                        ], width=4),
-                        dbc.Col([
-                            dcc.Dropdown(
-                                id='scatter-x-axis',  # Changed ID to 'type-filter' as per user request
-                                options=[
-                                    {'label': 'Sales Date', 'value': 'Sales Period'},
-                                    {'label': 'Item', 'value': 'Item'},
-                                    {'label': 'Category', 'value': 'Category'},
-                                    {'label': 'Family', 'value': 'Family'},
-                                    {'label': 'Material', 'value': 'Material'}
-                                ],
-                                value='Category',  # Default value
-                                placeholder='X axis',
-                                multi=False,
-                            )
-                        ], width=2),
-                        dbc.Col([
-                            dcc.Dropdown(
-                                id='scatter-y-axis',  # Changed ID to 'type-filter' as per user request
-                                options=[
-                                    {'label': 'Sales Date', 'value': 'Sales Period'},
-                                    {'label': 'Item', 'value': 'Item'},
-                                    {'label': 'Category', 'value': 'Category'},
-                                    {'label': 'Family', 'value': 'Family'},
-                                    {'label': 'Material', 'value': 'Material'}
-                                ],
-                                value='Material',  # Default value
-                                placeholder='Y axis',
-                                multi=False,
-                            )
-                        ], width=2),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                dcc.Graph(id='item-bar-plot')
+                            ], width=8),
+                            dbc.Col([
+                                dcc.Graph(id='category-bar-plot')
+                            ], width=4)
+                        ], style={'marginTop': '10px'}),
                     ]),
                     dbc.CardBody([
                         dbc.Row([
                             dbc.Col([
-                                dcc.Graph(id='scatter-plot')
-                            ], width=12)
+                                dcc.Graph(id='family-bar-plot')
+                            ], width=8),
+                            dbc.Col([
+                                dcc.Graph(id='material-bar-plot')
+                            ], width=4)
                         ], style={'marginTop': '10px'}),
                     ]),
-                ]),
-            ], className='light-blue-table')  # Apply custom card style
-        ], width=12)
-    ], style={'paddingBottom': '10px'}),
-
-
-    # Data Table
-    dbc.Row([
-        dbc.Col([
-            dash_table.DataTable(
-                id='datatable',
-                columns=[{'name': col, 'id': col} for col in merged_df.columns],
-                data=merged_df.to_dict('records'),
-                fixed_rows={'headers': True},
-                style_table={'height': '500px', 'overflowY': 'auto'},
-                style_cell={
-                    'textAlign': 'left',
-                    'minWidth': '100px',
-                    'maxWidth': '200px',
-                    'whiteSpace': 'normal'
-                },
-                style_header={
-                    'backgroundColor': '#D3D3D3',
-                    'fontWeight': 'bold',
-                    'border': '1px solid black'
-                },
-                style_data={
-                    'border': '1px solid black'
-                },
-                page_size=20  # Adjust based on preference
-            )
-        ], width=12)
-    ], style={'marginTop': '40px', 'paddingBottom': '40px'})
-], fluid=True)
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label('Time Format'),
+                                dcc.RadioItems(
+                                    id='scatter-type-filter',  # Changed ID to 'type-filter' as per user request
+                                    options=[
+                                        {'label': 'Daily', 'value': 'D'},
+                                        {'label': 'Weekly', 'value': 'W'},
+                                        {'label': 'Monthly', 'value': 'M'},
+                                        {'label': 'Yearly', 'value': 'Y'}
+                                    ],
+                                    value='D',  # Default value
+                                    labelStyle={'display': 'inline-block', 'margin-right': '15px'}
+                                )
+                            ], width=4),
+                            dbc.Col([
+                                html.Label('Size'),
+                                dcc.RadioItems(
+                                    id='scatter-size-filter',  # Changed ID to 'type-filter' as per user request
+                                    options=[
+                                        {'label': 'Sales Amount', 'value': 'Sales Amount'},
+                                        {'label': 'Sales Quantity', 'value': 'Sales Quantity'},
+                                    ],
+                                    value='Sales Amount',  # Default value
+                                    labelStyle={'display': 'inline-block', 'margin-right': '15px'}
+                                )
+                            ], width=4),
+                            dbc.Col([
+                                dcc.Dropdown(
+                                    id='scatter-x-axis',  # Changed ID to 'type-filter' as per user request
+                                    options=[
+                                        {'label': 'Sales Date', 'value': 'Sales Period'},
+                                        {'label': 'Item', 'value': 'Item'},
+                                        {'label': 'Category', 'value': 'Category'},
+                                        {'label': 'Family', 'value': 'Family'},
+                                        {'label': 'Material', 'value': 'Material'}
+                                    ],
+                                    value='Category',  # Default value
+                                    placeholder='X axis',
+                                    multi=False,
+                                )
+                            ], width=2),
+                            dbc.Col([
+                                dcc.Dropdown(
+                                    id='scatter-y-axis',  # Changed ID to 'type-filter' as per user request
+                                    options=[
+                                        {'label': 'Sales Date', 'value': 'Sales Period'},
+                                        {'label': 'Item', 'value': 'Item'},
+                                        {'label': 'Category', 'value': 'Category'},
+                                        {'label': 'Family', 'value': 'Family'},
+                                        {'label': 'Material', 'value': 'Material'}
+                                    ],
+                                    value='Material',  # Default value
+                                    placeholder='Y axis',
+                                    multi=False,
+                                )
+                            ], width=2),
+                        ]),
+                        dbc.CardBody([
+                            dbc.Row([
+                                dbc.Col([
+                                    dcc.Graph(id='scatter-plot')
+                                ], width=12)
+                            ], style={'marginTop': '10px'}),
+                        ]),
+                    ]),
+                ], className='light-blue-table')  # Apply custom card style
+            ], width=12)
+        ], style={'paddingBottom': '10px'}),
+
+
+        # Data Table
+        dbc.Row([
+            dbc.Col([
+                dash_table.DataTable(
+                    id='datatable',
+                    columns=table_columns(),
+                    # Rows are paged, sorted and filtered on the server (see update_table)
+                    data=[],
+                    page_action='custom',
+                    page_current=0,
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    fixed_rows={'headers': True},
+                    style_table={'height': '500px', 'overflowY': 'auto'},
+                    style_cell={
+                        'textAlign': 'left',
+                        'minWidth': '100px',
+                        'maxWidth': '200px',
+                        'whiteSpace': 'normal'
+                    },
+                    style_header={
+                        'backgroundColor': '#D3D3D3',
+                        'fontWeight': 'bold',
+                        'border': '1px solid black'
+                    },
+                    style_data={
+                        'border': '1px solid black'
+                    },
+                    page_size=20  # Adjust based on preference
+                )
+            ], width=12)
+        ], style={'marginTop': '40px', 'paddingBottom': '40px'})
+    ], fluid=True)
+
+
+app.layout = serve_layout
 
 # -------------------------------
 # Helper Function
 # -------------------------------
 
+# Filtered results shared by every callback that fires for the same interaction, keyed
+# on the dataset version and dropped whenever a new dataset is swapped in
+filter_cache = BoundedCache(maxsize=FILTER_CACHE_SIZE)
+dataset_handle.on_swap(lambda dataset: filter_cache.clear())
+
+# Filtered rows of the data table in the order the user sorted them, paged on request
+table_cache = BoundedCache(maxsize=FILTER_CACHE_SIZE)
+dataset_handle.on_swap(lambda dataset: table_cache.clear())
+
+# Sales card amounts per filter selection
+card_cache = BoundedCache(maxsize=FILTER_CACHE_SIZE)
+dataset_handle.on_swap(lambda dataset: card_cache.clear())
+
+# Scatter plot markers per filter selection and axes, reduced from the filtered data
+scatter_cache = BoundedCache(maxsize=FILTER_CACHE_SIZE)
+dataset_handle.on_swap(lambda dataset: scatter_cache.clear())
+
+
+def normalize_filters(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter):
+    """
+    Builds a hashable key describing a filter selection.
+
+    Equivalent selections (e.g. the same dropdown values picked in a different order, an
+    empty list instead of None, or a date sent with or without a time part) map to the
+    same key so that they share one cached result.
+
+    Returns:
+        tuple: (start, end, type_filter, categories, families, materials, items)
+    """
+    def normalize_values(values):
+        return tuple(sorted(set(values))) if values else ()
+
+    if start_date and end_date:
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    else:
+        start, end = None, None
+
+    return (start, end, type_filter,
+            normalize_values(category_filter),
+            normalize_values(family_filter),
+            normalize_values(material_filter),
+            normalize_values(item_filter))
+
+
+@metrics.instrument()
 def filter_data(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter):
     """
     Filters the merged_df based on the provided criteria.
 
+    The result is computed once per distinct selection and shared between callbacks, so
+    callers must treat the returned dataframe as read-only.
+
     Parameters:
         start_date (str): Start date in 'YYYY-MM-DD' format.
         end_date (str): End date in 'YYYY-MM-DD' format.
@@ -507,69 +741,111 @@ def filter_data(start_date, end_date, type_filter, category_filter, family_filte
     Returns:
         pd.DataFrame: Filtered and aggregated dataframe.
     """
-    # Make a copy of the merged data
-    filtered_df = merged_df.copy()
+    dataset = dataset_handle.current()
+    key = normalize_filters(start_date, end_date, type_filter, category_filter, family_filter,
+                            material_filter, item_filter)
 
-    # Ensure 'Sales Date' is in datetime format
-    filtered_df['Sales Date'] = pd.to_datetime(filtered_df['Sales Date'], errors='coerce')
+    def compute_filtered():
+        metrics.count_rows(input_rows=len(dataset.merged_df))
+        return query_sales(dataset, *key)
 
-    # Filter by date range
-    if start_date and end_date:
-        filtered_df = filtered_df[
-            (filtered_df['Sales Date'] >= pd.to_datetime(start_date)) &
-            (filtered_df['Sales Date'] <= pd.to_datetime(end_date))
-        ]
-
-    # Apply category filter if specified
-    if category_filter:
-        filtered_df = filtered_df[filtered_df['Category'].isin(category_filter)]
-
-    # Apply family filter if specified
-    if family_filter:
-        filtered_df = filtered_df[filtered_df['Family'].isin(family_filter)]
-
-    # Apply material filter if specified
-    if material_filter:
-        filtered_df = filtered_df[filtered_df['Material'].isin(material_filter)]
-
-    # Apply item filter if specified
-    if item_filter:
-        filtered_df = filtered_df[filtered_df['Item'].isin(item_filter)]
-
-    # Aggregate data based on the type_filter (time aggregation)
-    if type_filter == 'D':
-        # Daily aggregation
-        filtered_df['Sales Period'] = filtered_df['Sales Date'].dt.to_period('D').dt.to_timestamp()
-    elif type_filter == 'W':
-        # Weekly aggregation
-        filtered_df['Sales Period'] = filtered_df['Sales Date'].dt.to_period('W').dt.to_timestamp()
-    elif type_filter == 'M':
-        # Monthly aggregation
-        filtered_df['Sales Period'] = filtered_df['Sales Date'].dt.to_period('M').dt.to_timestamp()
-    elif type_filter == 'Y':
-        # Yearly aggregation
-        filtered_df['Sales Period'] = filtered_df['Sales Date'].dt.to_period('Y').dt.to_timestamp()
-    else:
-        # Default to daily if no valid type_filter is provided
-        filtered_df['Sales Period'] = filtered_df['Sales Date']
+    filtered_data = filter_cache.get_or_compute((dataset.version,) + key, compute_filtered)
+    metrics.count_rows(output_rows=len(filtered_data))
+    return filtered_data
+
+# -------------------------------
+# Callbacks
+# -------------------------------
 
-    # Group the filtered data by 'Sales Period' and other relevant columns, then sum the sales
-    aggregated_df = filtered_df.groupby(['Sales Period', 'Item', 'Category', 'Material', 'Family']).agg({
-        'Sales Quantity': 'sum',
-        'Sales Amount': 'sum'
-    }).reset_index()
+def selected_filters(category_filter, family_filter, material_filter, item_filter):
+    """
+    Collects the dropdown selections per dimension column.
+    """
+    return {'Category': category_filter or [], 'Family': family_filter or [], 'Material': material_filter or [],
+            'Item': item_filter or []}
 
-    # Sort the dataframe by 'Sales Period' in ascending order
-    aggregated_df.sort_values(['Sales Period'], ascending=True, inplace=True)
 
-    # Round the Sales Amount to 2 decimal places
-    aggregated_df['Sales Amount'] = aggregated_df['Sales Amount'].round(2)
+def dimension_options(column, filters):
+    """
+    Builds the options of a dimension dropdown: the values co-occurring with the selections
+    of the other dropdowns, plus the values selected in this one so they stay selected.
 
-    return aggregated_df
+    Parameters:
+        column (str): Dimension column ('Category', 'Family' or 'Material').
+        filters (dict): Output of selected_filters.
+
+    Returns:
+        list: Dropdown options.
+    """
+    values = dimension_index(dataset_handle.current()).options(column, filters)
+    values += [value for value in filters[column] if value not in set(values)]
+    return [{'label': name, 'value': name} for name in values]
+
+
+# Callbacks to offer the dimension values that co-occur with the other selections
+@app.callback(
+    Output('category-dropdown', 'options'),
+    [Input('family-dropdown', 'value'),
+     Input('material-dropdown', 'value'),
+     Input('item-dropdown', 'value')],
+    [State('category-dropdown', 'value')]
+)
+def update_category_options(family_filter, material_filter, item_filter, category_filter):
+    return dimension_options('Category', selected_filters(category_filter, family_filter, material_filter,
+                                                          item_filter))
+
+
+@app.callback(
+    Output('family-dropdown', 'options'),
+    [Input('category-dropdown', 'value'),
+     Input('material-dropdown', 'value'),
+     Input('item-dropdown', 'value')],
+    [State('family-dropdown', 'value')]
+)
+def update_family_options(category_filter, material_filter, item_filter, family_filter):
+    return dimension_options('Family', selected_filters(category_filter, family_filter, material_filter,
+                                                        item_filter))
+
+
+@app.callback(
+    Output('material-dropdown', 'options'),
+    [Input('category-dropdown', 'value'),
+     Input('family-dropdown', 'value'),
+     Input('item-dropdown', 'value')],
+    [State('material-dropdown', 'value')]
+)
+def update_material_options(category_filter, family_filter, item_filter, material_filter):
+    return dimension_options('Material', selected_filters(category_filter, family_filter, material_filter,
+                                                          item_filter))
+
+
+# Callback to offer the items matching the text typed in the Item dropdown and the other selections
+@app.callback(
+    Output('item-dropdown', 'options'),
+    [Input('item-dropdown', 'search_value'),
+     Input('category-dropdown', 'value'),
+     Input('family-dropdown', 'value'),
+     Input('material-dropdown', 'value')],
+    [State('item-dropdown', 'value')]
+)
+def update_item_options(search_value, category_filter, family_filter, material_filter, item_filter):
+    """
+    Updates the Item dropdown options with the items matching the search text and the
+    Category, Family and Material selections.
+
+    The selected items are always kept in the options, otherwise the dropdown would drop
+    them from the selection.
+    """
+    dataset = dataset_handle.current()
+    filters = selected_filters(category_filter, family_filter, material_filter, item_filter)
+    allowed = dimension_index(dataset).items(filters, exclude='Item')
+    matches = item_search_index(dataset).search(search_value, ITEM_SEARCH_LIMIT, allowed)
+
+    selected = filters['Item']
+    selected_set = set(selected)
+    items = selected + [item for item in matches if item not in selected_set]
+    return [{'label': item, 'value': item} for item in items]
 
-# -------------------------------
-# Callbacks
-# -------------------------------
 
 # Callback to update bar plots
 @app.callback(
@@ -586,6 +862,7 @@ def filter_data(start_date, end_date, type_filter, category_filter, family_filte
      Input('item-dropdown', 'value'),
      Input('sort-order-radio', 'value')]
 )
+@metrics.instrument()
 def update_bar_plots(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter, sort_order):
     """
     Updates the bar plots based on the selected filters.
@@ -593,6 +870,9 @@ def update_bar_plots(start_date, end_date, type_filter, category_filter, family_
     # Filter the data
     filtered_data = filter_data(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter)
 
+    # Totals of all four dimensions, computed together in one pass over the rows
+    totals = dimension_totals(filtered_data)
+
     # Function to create a bar plot with custom hover template
     def create_bar_plot(group_col, title):
         """
@@ -605,14 +885,12 @@ def update_bar_plots(start_date, end_date, type_filter, category_filter, family_
         Returns:
             plotly.graph_objs.Figure: The bar plot figure.
         """
-        # Grouping by the specified column and calculating total quantity and amount
-        grouped_data = filtered_data.groupby(group_col)[['Sales Quantity', 'Sales Amount']].sum().reset_index()
+        grouped_data = totals[group_col]
 
         # Sorting based on Sales Quantity and limiting to top 50 if applicable
-        if group_col in ['Item', 'Family']:
-            sorted_data = grouped_data.sort_values('Sales Quantity', ascending=(sort_order == 'asc')).head(50)
-        else:
-            sorted_data = grouped_data.sort_values('Sales Quantity', ascending=(sort_order == 'asc'))
+        limit = 50 if group_col in ['Item', 'Family'] else None
+        sorted_data = grouped_data.take(top_k(grouped_data['Sales Quantity'].values, limit,
+                                              ascending=(sort_order == 'asc')))
 
         # Create the bar plot with hovertemplate for both quantity and amount
         fig = go.Figure(data=[
@@ -634,7 +912,7 @@ def update_bar_plots(start_date, end_date, type_filter, category_filter, family_
             title=title,
             xaxis_title=group_col,
             yaxis_title='Total Sales Quantity',
-            template='plotly_white'
+            template=FIGURE_TEMPLATE
         )
         return fig
 
@@ -644,6 +922,8 @@ def update_bar_plots(start_date, end_date, type_filter, category_filter, family_
     family_fig = create_bar_plot('Family', 'Top 50 Sales Quantity by Family')
     material_fig = create_bar_plot('Material', 'Total Sales Quantity by Material')
 
+    metrics.count_rows(input_rows=len(filtered_data),
+                       output_rows=sum(len(fig.data[0].x) for fig in (item_fig, category_fig, family_fig, material_fig)))
     return item_fig, category_fig, family_fig, material_fig
 
 # Callback to update the time-series plot
@@ -657,6 +937,7 @@ def update_bar_plots(start_date, end_date, type_filter, category_filter, family_
      Input('material-dropdown', 'value'),
      Input('item-dropdown', 'value')]
 )
+@metrics.instrument()
 def update_time_series_plot(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter):
     """
     Updates the time-series plot based on the selected filters and time aggregation.
@@ -666,13 +947,17 @@ def update_time_series_plot(start_date, end_date, type_filter, category_filter,
 
     # Group by 'Sales Period' and calculate the sums
     time_series_data = filtered_data.groupby('Sales Period')[['Sales Quantity', 'Sales Amount']].sum().reset_index()
+    metrics.count_rows(input_rows=len(filtered_data), output_rows=len(time_series_data))
+
+    # Periods are sent as a typed array of epoch milliseconds on a date axis
+    periods = typed_dates(time_series_data['Sales Period'])
 
     # Create figure with two traces for quantity and amount
     fig = go.Figure()
 
     # Add Sales Quantity line
     fig.add_trace(go.Scatter(
-        x=time_series_data['Sales Period'],
+        x=periods,
         y=time_series_data['Sales Quantity'],
         mode='lines',
         name='Sales Quantity',
@@ -686,7 +971,7 @@ def update_time_series_plot(start_date, end_date, type_filter, category_filter,
 
     # Add Sales Amount line with dotted style on the secondary y-axis
     fig.add_trace(go.Scatter(
-        x=time_series_data['Sales Period'],
+        x=periods,
         y=time_series_data['Sales Amount'],
         mode='lines',
         name='Sales Amount',
@@ -703,6 +988,7 @@ def update_time_series_plot(start_date, end_date, type_filter, category_filter,
     fig.update_layout(
         title='Total Sales Quantity and Sales Amount Over Time',
         xaxis_title='Sales Period',
+        xaxis_type='date',
         yaxis_title='Total Sales Quantity',
         yaxis=dict(
             title='Total Sales Quantity',
@@ -717,44 +1003,78 @@ def update_time_series_plot(start_date, end_date, type_filter, category_filter,
             zeroline=False
         ),
         legend=dict(x=1, y=1.2, bgcolor='rgba(255,255,255,0)'),
-        template='plotly_white'
+        template=FIGURE_TEMPLATE
     )
 
     return fig
 
+def paging_triggered():
+    """
+    Tells whether the running callback was triggered by the table paging controls only.
+
+    Returns:
+        bool: True for a page or page size change, or when called directly outside a
+            callback, so the requested page is kept.
+    """
+    try:
+        triggered = dash.ctx.triggered_prop_ids
+    except MissingCallbackContextException:
+        return True
+    return all(prop_id in ('datatable.page_current', 'datatable.page_size') for prop_id in triggered)
+
 # Callback to update the data table
 @app.callback(
-    Output('datatable', 'data'),
+    [Output('datatable', 'data'),
+     Output('datatable', 'page_count'),
+     Output('datatable', 'page_current')],
     [Input('date-picker-range', 'start_date'),
      Input('date-picker-range', 'end_date'),
      Input('type-filter', 'value'),
      Input('category-dropdown', 'value'),
      Input('family-dropdown', 'value'),
      Input('material-dropdown', 'value'),
-     Input('item-dropdown', 'value')]
+     Input('item-dropdown', 'value'),
+     Input('datatable', 'page_current'),
+     Input('datatable', 'page_size'),
+     Input('datatable', 'sort_by'),
+     Input('datatable', 'filter_query')]
 )
-def update_table(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter):
+@metrics.instrument()
+def update_table(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter,
+                 page_current, page_size, sort_by, filter_query):
     """
     Updates the data table based on the selected filters.
-    """
-    # Filter the data
-    filtered_data = filter_data(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter)
-
-    # Format 'Sales Period' as string in 'MM/DD/YYYY' format if it's a Timestamp
-    if pd.api.types.is_datetime64_any_dtype(filtered_data['Sales Period']):
-        filtered_data['Sales Period'] = filtered_data['Sales Period'].dt.strftime("%m/%d/%Y")
 
-    return filtered_data.to_dict('records')
+    Only the requested page is formatted and sent; the filtered and sorted rows it is cut
+    from stay on the server. Any change other than paging starts again from the first page,
+    and the page actually shown is written back to the table.
+    """
+    if not paging_triggered():
+        page_current = 0
+
+    dataset = dataset_handle.current()
+    key = normalize_filters(start_date, end_date, type_filter, category_filter, family_filter,
+                            material_filter, item_filter)
+    sort_key = tuple((col.get('column_id'), col.get('direction')) for col in (sort_by or []))
+
+    def compute_table():
+        # Filter the data
+        filtered_data = filter_data(start_date, end_date, type_filter, category_filter, family_filter,
+                                    material_filter, item_filter)
+        metrics.count_rows(input_rows=len(filtered_data))
+        return sort_table(filter_table(filtered_data, filter_query), sort_by)
+
+    table_data = table_cache.get_or_compute((dataset.version,) + key + (sort_key, filter_query or ''),
+                                            compute_table)
+    page_data, page_count, page_current = table_page(table_data, page_current, page_size)
+    metrics.count_rows(output_rows=len(page_data))
+    return page_data, page_count, page_current
 
 # Callback to update Total Sales Amount and Additional Sales Amount Cards
 @app.callback(
     [
         Output('total-sales-amount', 'children'),
-        Output('ss-sales-amount', 'children'),
-        Output('ti-sales-amount', 'children'),
-        Output('nb-sales-amount', 'children'),
-        Output('gold-sales-amount', 'children'),
-        Output('others-sales-amount', 'children')
+        *[Output(bucket['id'], 'children') for bucket in SALES_CARD_BUCKETS]
     ],
     [
         Input('date-picker-range', 'start_date'),
@@ -766,41 +1086,34 @@ def update_table(start_date, end_date, type_filter, category_filter, family_filt
         Input('item-dropdown', 'value')
     ]
 )
+@metrics.instrument()
 def update_sales_cards(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter):
     """
-    Updates the Total Sales Amount and five additional sales amount cards based on the selected filters.
+    Updates the Total Sales Amount card and the material bucket cards based on the selected filters.
     """
-    # Filter the data
-    filtered_data = filter_data(start_date, end_date, type_filter, category_filter, family_filter, material_filter, item_filter)
-
-    # Calculate Total Sales Amount
-    total_sales_amount = filtered_data['Sales Amount'].sum()
-
-    # Calculate SS Sales Amount
-    ss_sales_amount = filtered_data[filtered_data['Material'] == 'SS']['Sales Amount'].sum()
-
-    # Calculate TI Sales Amount
-    ti_sales_amount = filtered_data[filtered_data['Material'] == 'TI']['Sales Amount'].sum()
-
-    # Calculate NB Sales Amount
-    nb_sales_amount = filtered_data[filtered_data['Material'] == 'NB']['Sales Amount'].sum()
-
-    # Calculate Gold Sales Amount (materials "RG", "WG", "YG")
-    gold_materials = ['RG', 'WG', 'YG']
-    gold_sales_amount = filtered_data[filtered_data['Material'].isin(gold_materials)]['Sales Amount'].sum()
-
-    # Calculate Others Sales Amount (all other materials)
-    others_sales_amount = filtered_data[~filtered_data['Material'].isin(['SS', 'TI', 'NB'] + gold_materials)]['Sales Amount'].sum()
+    dataset = dataset_handle.current()
+    key = normalize_filters(start_date, end_date, type_filter, category_filter, family_filter,
+                            material_filter, item_filter)
+
+    def compute_amounts():
+        # Filter the data
+        filtered_data = filter_data(start_date, end_date, type_filter, category_filter, family_filter,
+                                    material_filter, item_filter)
+        metrics.count_rows(input_rows=len(filtered_data))
+
+        # Total Sales Amount and the amount of each bucket, from one pass over the material codes
+        total_sales_amount = filtered_data['Sales Amount'].sum()
+        bucket_amounts = bucket_totals(filtered_data, 'Material',
+                                       [bucket['materials'] for bucket in SALES_CARD_BUCKETS])
+        # The amounts are dollars with cents: round to cents so the summation error cannot
+        # change the whole-dollar display (e.g. 22655.4999999 instead of 22655.5)
+        return [total_sales_amount, *bucket_amounts.round(2)]
+
+    amounts = card_cache.get_or_compute((dataset.version,) + key, compute_amounts)
+    metrics.count_rows(output_rows=len(amounts))
 
     # Format the amounts as currency
-    formatted_total = f"${total_sales_amount:,.0f}"
-    formatted_ss = f"${ss_sales_amount:,.0f}"
-    formatted_ti = f"${ti_sales_amount:,.0f}"
-    formatted_nb = f"${nb_sales_amount:,.0f}"
-    formatted_gold = f"${gold_sales_amount:,.0f}"
-    formatted_others = f"${others_sales_amount:,.0f}"
-
-    return formatted_total, formatted_ss, formatted_ti, formatted_nb, formatted_gold, formatted_others
+    return [f"${amount:,.0f}" for amount in amounts]
 
 
 @app.callback(
@@ -817,41 +1130,71 @@ def update_sales_cards(start_date, end_date, type_filter, category_filter, famil
      Input('scatter-y-axis', 'value'),
      ]
 )
+@metrics.instrument()
 def update_scatter_plot(start_date, end_date, type_filter, category_filter, family_filter, material_filter,
                         item_filter, size_filter, x_axis_column, y_axis_column):
-    # Filter the data
-    filtered_df = filter_data(start_date, end_date, type_filter, category_filter, family_filter, material_filter,
-                              item_filter)
+    """
+    Updates the scatter plot based on the selected filters and axes.
+
+    Rows with the same (x, y) pair are combined into one marker and at most
+    SCATTER_MAX_POINTS markers are sent (see reduce_scatter). Above SCATTER_GL_THRESHOLD
+    markers the plot is drawn with WebGL.
+    """
+    dataset = dataset_handle.current()
+    key = normalize_filters(start_date, end_date, type_filter, category_filter, family_filter,
+                            material_filter, item_filter)
 
-    print("Columns :")
-    print(filtered_df.columns)
+    def compute_markers():
+        # Filter the data
+        filtered_df = filter_data(start_date, end_date, type_filter, category_filter, family_filter,
+                                  material_filter, item_filter)
+        metrics.count_rows(input_rows=len(filtered_df))
+        return reduce_scatter(filtered_df, x_axis_column, y_axis_column, size_filter, SCATTER_MAX_POINTS)
+
+    markers, dropped = scatter_cache.get_or_compute(
+        (dataset.version,) + key + (size_filter, x_axis_column, y_axis_column), compute_markers)
+    metrics.count_rows(output_rows=len(markers))
 
     # Determine the scaling factor for the size of markers
-    max_size = filtered_df[f"{size_filter}"].max() if len(filtered_df) > 0 else 1
+    max_size = markers[f"{size_filter}"].max() if len(markers) > 0 else 1
     sizeref = 2 * max_size / 100  # Adjust this scaling factor for better results
 
+    # Dates are sent as typed arrays on date axes
+    x_values, x_type = axis_values(markers[f"{x_axis_column}"])
+    y_values, y_type = axis_values(markers[f"{y_axis_column}"])
+
     # Create scatter plot
+    scatter_type = go.Scattergl if len(markers) > SCATTER_GL_THRESHOLD else go.Scatter
     scatter_plot = go.Figure(data=[
-        go.Scatter(
-            x=filtered_df[f"{x_axis_column}"],
-            y=filtered_df[f"{y_axis_column}"],
+        scatter_type(
+            x=x_values,
+            y=y_values,
             mode='markers',
             marker=dict(
-                size=filtered_df[f"{size_filter}"],
+                size=markers[f"{size_filter}"].clip(lower=0),
                 color='blue',
                 opacity=0.7,
                 sizeref=sizeref,  # Adjusts size scaling
                 sizemin=4,  # Minimum size of the marker
             ),
-            text=filtered_df['Item']
+            text=markers['Text'],
+            customdata=markers['Rows'],
+            hovertemplate='%{text}<br>%{x}, %{y}<br>' + f'{size_filter}: ' + '%{marker.size:,.0f}'
+                          '<br>Rows: %{customdata}<extra></extra>',
         )
     ])
 
+    title = "Sales Scatter Plot"
+    if dropped:
+        title += f" (largest {len(markers):,} of {len(markers) + dropped:,} points)"
+
     scatter_plot.update_layout(
-        title="Sales Scatter Plot",
+        title=title,
         xaxis_title=f"{x_axis_column}",
+        xaxis_type=x_type,
         yaxis_title=f"{y_axis_column}",
-        template="plotly_white"
+        yaxis_type=y_type,
+        template=FIGURE_TEMPLATE
     )
 
     return scatter_plot
@@ -0,0 +1,101 @@
+import gzip
+import json
+import threading
+
+from flask import request
+
+
+class ResponseStats:
+    """
+    Size of the callback responses sent by the dashboard, per callback.
+
+    Every response to a Dash callback request is measured once it is built: the size of
+    the JSON body and its size once gzip-compressed, roughly what is sent to browsers when
+    compression is enabled. The callback is identified by its output(s).
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, callback, size, compressed_size):
+        """
+        Adds one response of a callback.
+
+        Args:
+        - callback (str): Output(s) of the callback, e.g. 'scatter-plot.figure'.
+        - size (int): Bytes of the response body.
+        - compressed_size (int): Bytes of the gzip-compressed body.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(callback, {'responses': 0, 'bytes': 0, 'gzip_bytes': 0,
+                                                      'max_bytes': 0, 'last_bytes': 0})
+            stats['responses'] += 1
+            stats['bytes'] += size
+            stats['gzip_bytes'] += compressed_size
+            stats['max_bytes'] = max(stats['max_bytes'], size)
+            stats['last_bytes'] = size
+
+    def record_response(self, callback, output, body):
+        """
+        Adds one response, as passed by measure_callback_responses.
+
+        Args:
+        - callback (str): Name of the callback function (unused, responses are keyed by output).
+        - output (str): Output(s) of the callback.
+        - body (bytes): Plain response body.
+        """
+        self.record(output, len(body), len(gzip.compress(body, 6)))
+
+    def snapshot(self):
+        """
+        Returns:
+        - dict: Statistics per callback (responses, total/max/last bytes and total gzip bytes).
+        """
+        with self._lock:
+            return {callback: dict(stats) for callback, stats in self._stats.items()}
+
+
+def measure_callback_responses(app, recorders):
+    """
+    Function to pass every callback response of a Dash app to the given recorders.
+
+    A single hook reads each response body once and hands it to every recorder, so the
+    response statistics and the callback metrics can be collected together.
+
+    Args:
+    - app (dash.Dash): The app.
+    - recorders (list): Objects with a record_response(callback, output, body) method
+      (ResponseStats, callback_metrics.CallbackMetrics); callback is the name of the callback
+      function (the output if unknown), output the callback's output(s).
+    """
+    @app.server.after_request
+    def measure_response(response):
+        # Registered after Dash's compression (if any), so it runs first and sees the plain body
+        if request.path.endswith('_dash-update-component') and not response.direct_passthrough:
+            body = response.get_data()
+            payload = request.get_json(silent=True) or {}
+            output = payload.get('output', request.path)
+            function = app.callback_map.get(output, {}).get('callback')
+            for recorder in recorders:
+                recorder.record_response(getattr(function, '__name__', output), output, body)
+        return response
+
+
+def install_response_stats(server, stats, path='/_response-stats'):
+    """
+    Function to serve response statistics as JSON.
+
+    Args:
+    - server (flask.Flask): Server of the Dash app (app.server).
+    - stats (ResponseStats): Statistics filled through measure_callback_responses.
+    - path (str): Route returning the statistics.
+
+    Returns:
+    - ResponseStats: stats.
+    """
+    @server.route(path)
+    def response_stats():
+        return server.response_class(json.dumps(stats.snapshot(), indent=2), mimetype='application/json')
+
+    return stats
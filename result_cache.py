@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """
+    Thread-safe least-recently-used cache for derived results.
+
+    Dash fires every callback that shares an input as a separate request, so several
+    threads usually ask for the same key at the same moment. Only the first one computes
+    the value; the others wait for it and reuse the stored result.
+
+    Args:
+    - maxsize (int): Maximum number of results kept before the oldest one is evicted.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() to build it on a miss.
+
+        Args:
+        - key (hashable): Normalized cache key.
+        - compute (callable): Zero-argument function producing the value.
+
+        Returns:
+        - object: The cached or freshly computed value.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            key_lock = self._pending.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished the same key while we were waiting
+            with self._lock:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    return self._data[key]
+            try:
+                value = compute()
+                with self._lock:
+                    self._data[key] = value
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        """
+        Drop every cached value.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,438 @@
+import numpy as np
+import pandas as pd
+
+from data_transform_functions import category_codes
+
+# Columns the filtered data is aggregated on, in the order of the result
+GROUP_COLUMNS = ['Sales Period', 'Item', 'Category', 'Material', 'Family']
+DIMENSION_COLUMNS = ['Category', 'Family', 'Material', 'Item']
+
+# Time aggregation levels offered by the dashboard
+PERIOD_TYPES = ('D', 'W', 'M', 'Y')
+
+# Dimensions every item belongs to exactly one value of
+ITEM_ATTRIBUTES = ['Category', 'Family', 'Material']
+MEASURE_COLUMNS = ['Sales Quantity', 'Sales Amount']
+
+
+def aggregate_periods(df, type_filter):
+    """
+    Function to sum daily sales per period and dimension values.
+
+    Args:
+    - df (pd.DataFrame): Encoded daily sales data.
+    - type_filter (str): Aggregation level ('D', 'W', 'M', 'Y').
+
+    Returns:
+    - pd.DataFrame: GROUP_COLUMNS with the summed measures, sorted by GROUP_COLUMNS.
+    """
+    periods = df['Sales Date'].dt.to_period(type_filter).dt.to_timestamp()
+    return df.assign(**{'Sales Period': periods}).groupby(GROUP_COLUMNS, observed=True).agg({
+        'Sales Quantity': 'sum',
+        'Sales Amount': 'sum'
+    }).reset_index()
+
+
+def build_rollup(merged_df, type_filter):
+    """
+    Function to build the rollup of the whole dataset for one aggregation level.
+
+    Args:
+    - merged_df (pd.DataFrame): Encoded daily sales data.
+    - type_filter (str): Aggregation level ('D', 'W', 'M', 'Y').
+
+    Returns:
+    - pd.DataFrame: Output of aggregate_periods over every row.
+    """
+    return aggregate_periods(merged_df, type_filter)
+
+
+class IndexedTable:
+    """
+    Table with an inverted index on each dimension column.
+
+    For every column the row ids are grouped by category code (one array of row ids, sorted
+    within each code, plus the offset where each code's run starts), so the rows holding a
+    set of values are found without scanning the table.
+
+    Args:
+    - df (pd.DataFrame): Table with categorical DIMENSION_COLUMNS.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.codes = {}
+        self.postings = {}
+        for column in DIMENSION_COLUMNS:
+            codes = df[column].cat.codes.values
+            row_ids = np.argsort(codes, kind='stable')
+            offsets = np.searchsorted(codes[row_ids], np.arange(len(df[column].cat.categories) + 1))
+            self.codes[column] = codes
+            self.postings[column] = (row_ids, offsets)
+
+    def rows(self, column, values, lo, hi):
+        """
+        Returns the sorted ids of the rows in [lo, hi) whose column holds one of values.
+        """
+        row_ids, offsets = self.postings[column]
+        parts = []
+        for code in category_codes(self.df[column], values):
+            run = row_ids[offsets[code]:offsets[code + 1]]
+            parts.append(run[np.searchsorted(run, lo):np.searchsorted(run, hi)])
+        if not parts:
+            return np.array([], dtype=np.intp)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def select(self, lo, hi, filters):
+        """
+        Returns the rows in [lo, hi) matching every dimension filter.
+
+        Values selected within a dimension are united and dimensions are intersected: the
+        most selective dimension provides the candidate rows and the other dimensions are
+        only checked on those candidates, so the cost follows the number of matching rows.
+        Without filters the range is returned as a slice.
+
+        Args:
+        - lo, hi (int): Row range (positions in the table).
+        - filters (dict): Selected values per dimension column; empty selections are ignored.
+
+        Returns:
+        - pd.DataFrame: Matching rows.
+        """
+        active = [column for column in DIMENSION_COLUMNS if filters.get(column)]
+        if not active:
+            return self.df.iloc[lo:hi]
+
+        candidates = {column: self.rows(column, filters[column], lo, hi) for column in active}
+        driver = min(active, key=lambda column: len(candidates[column]))
+        row_ids = candidates[driver]
+        for column in active:
+            if column != driver and len(row_ids):
+                wanted = category_codes(self.df[column], filters[column])
+                row_ids = row_ids[np.isin(self.codes[column][row_ids], wanted)]
+        return self.df.take(row_ids)
+
+
+class DimensionIndex:
+    """
+    Item -> (Category, Family, Material) index of a dataset, used to offer only the
+    dimension values that still co-occur with the current selections.
+
+    Every item belongs to exactly one category, family and material, so the index holds
+    one code per item and dimension; the options are computed from these arrays, whose
+    size is the number of items, instead of from the sales rows.
+
+    Args:
+    - df (pd.DataFrame): Encoded sales data with categorical DIMENSION_COLUMNS.
+    """
+
+    def __init__(self, df):
+        self.categories = {column: df[column].cat.categories for column in DIMENSION_COLUMNS}
+        item_codes = df['Item'].cat.codes.values
+        item_count = len(self.categories['Item'])
+        self.present = np.bincount(item_codes[item_codes >= 0], minlength=item_count) > 0
+        self.item_attributes = {'Item': np.arange(item_count)}
+        for column in ITEM_ATTRIBUTES:
+            codes = np.full(item_count, -1, dtype=np.int64)
+            codes[item_codes] = df[column].cat.codes.values
+            self.item_attributes[column] = codes
+
+    def items(self, filters, exclude=None):
+        """
+        Returns a boolean mask over the item codes of the items matching the filters.
+
+        Args:
+        - filters (dict): Selected values per dimension column; empty selections are ignored.
+        - exclude (str): Dimension whose own selection is ignored.
+
+        Returns:
+        - np.ndarray: True for the matching items.
+        """
+        mask = self.present.copy()
+        for column in DIMENSION_COLUMNS:
+            if column != exclude and filters.get(column):
+                codes = self.categories[column].get_indexer(list(filters[column]))
+                mask &= np.isin(self.item_attributes[column], codes[codes >= 0])
+        return mask
+
+    def options(self, column, filters):
+        """
+        Returns the values of a dimension that co-occur with the selections of the other
+        dimensions, in category order.
+
+        The dimension's own selection is ignored, so further values can still be added to it.
+
+        Args:
+        - column (str): Dimension column.
+        - filters (dict): Selected values per dimension column.
+
+        Returns:
+        - list: Dimension values.
+        """
+        codes = np.unique(self.item_attributes[column][self.items(filters, exclude=column)])
+        return self.categories[column][codes[codes >= 0]].tolist()
+
+
+def rollup_table(dataset, type_filter):
+    """
+    Function to return the indexed rollup of a dataset for one aggregation level, building it once.
+    """
+    return dataset.derived(('rollup', type_filter),
+                           lambda: IndexedTable(build_rollup(dataset.merged_df, type_filter)))
+
+
+def daily_table(dataset):
+    """
+    Function to return the indexed daily rows of a dataset, building the index once.
+    """
+    return dataset.derived('daily', lambda: IndexedTable(dataset.merged_df))
+
+
+def dimension_index(dataset):
+    """
+    Function to return the dimension index of a dataset, building it once.
+    """
+    return dataset.derived('dimensions', lambda: DimensionIndex(dataset.merged_df))
+
+
+def build_query_tables(dataset):
+    """
+    Function to build the indexed daily table, the dimension index and the rollups of
+    every aggregation level ahead of the first request.
+    """
+    daily_table(dataset)
+    dimension_index(dataset)
+    for type_filter in PERIOD_TYPES:
+        rollup_table(dataset, type_filter)
+
+
+def to_day(timestamp):
+    """
+    Function to convert a timestamp to the 'Sales Day' number (days since 1970-01-01).
+    """
+    return int(np.datetime64(timestamp, 'D').astype('int64'))
+
+
+def day_bounds(merged_df, first_day, end_day):
+    """
+    Function to locate the daily rows of a day range by binary search.
+
+    Args:
+    - merged_df (pd.DataFrame): Encoded sales data sorted by 'Sales Day' (see sort_sales_days).
+    - first_day (pd.Timestamp): First day of the range.
+    - end_day (pd.Timestamp): Day after the range.
+
+    Returns:
+    - tuple: (lo, hi) positions of the rows with first_day <= 'Sales Date' < end_day.
+    """
+    lo, hi = np.searchsorted(merged_df['Sales Day'].values, [to_day(first_day), to_day(end_day)], side='left')
+    return lo, hi
+
+
+def period_bounds(rollup, start, end):
+    """
+    Function to locate the rollup rows of the periods starting in [start, end) by binary search.
+
+    Args:
+    - rollup (pd.DataFrame): Rollup table, sorted by 'Sales Period'.
+    - start, end (pd.Timestamp): Range of period starts.
+
+    Returns:
+    - tuple: (lo, hi) positions of the matching rows.
+    """
+    lo, hi = rollup['Sales Period'].searchsorted([start, end], side='left')
+    return lo, hi
+
+
+def full_period_bounds(first_day, last_day, type_filter):
+    """
+    Function to find the whole periods inside a date range.
+
+    Args:
+    - first_day (pd.Timestamp): First day of the range.
+    - last_day (pd.Timestamp): Last day of the range.
+    - type_filter (str): Aggregation level ('D', 'W', 'M', 'Y').
+
+    Returns:
+    - tuple: (start of the first whole period, start of the period after the last whole
+      one). Both are equal when the range holds no whole period.
+    """
+    first_period = pd.Period(first_day, type_filter)
+    last_period = pd.Period(last_day, type_filter)
+    full_start = first_period.start_time if first_day == first_period.start_time else (first_period + 1).start_time
+    full_end = (last_period + 1).start_time if last_day == last_period.end_time.normalize() else last_period.start_time
+    return full_start, max(full_start, full_end)
+
+
+def query_sales(dataset, start_date, end_date, type_filter, category_filter, family_filter, material_filter,
+                item_filter):
+    """
+    Function to filter and aggregate a dataset for a normalized selection.
+
+    Whole periods inside the date range are read from the rollup of the aggregation level;
+    only the partial periods at either end of the range are aggregated from the daily rows.
+    Both tables are sorted by date, so the ranges are located by binary search, and the
+    dimension filters are resolved through their inverted indexes before any row is copied.
+
+    Args:
+    - dataset (Dataset): Dataset to query.
+    - start_date, end_date (pd.Timestamp): Date range (inclusive), or None for all dates.
+    - type_filter (str): Aggregation level ('D', 'W', 'M', 'Y'); anything else means daily.
+    - category_filter, family_filter, material_filter, item_filter (tuple): Selected values.
+
+    Returns:
+    - pd.DataFrame: Filtered and aggregated data sorted by 'Sales Period', with
+      'Sales Amount' rounded to 2 decimals.
+    """
+    if type_filter not in PERIOD_TYPES:
+        type_filter = 'D'
+    filters = {'Category': category_filter, 'Family': family_filter, 'Material': material_filter,
+               'Item': item_filter}
+    rollup = rollup_table(dataset, type_filter)
+
+    if start_date is None or end_date is None:
+        aggregated_df = rollup.select(0, len(rollup.df), filters)
+    else:
+        # The data holds whole days: keep the days d with start_date <= d <= end_date
+        first_day = start_date.ceil('D')
+        last_day = end_date.floor('D')
+        if first_day > last_day:
+            aggregated_df = rollup.df.iloc[:0]
+        else:
+            full_start, full_end = full_period_bounds(first_day, last_day, type_filter)
+            daily = daily_table(dataset)
+
+            def partial(start, end):
+                lo, hi = day_bounds(daily.df, start, end)
+                return aggregate_periods(daily.select(lo, hi, filters), type_filter)
+
+            parts = []
+            if full_start == full_end:
+                parts.append(partial(first_day, last_day + pd.Timedelta(days=1)))
+            else:
+                if first_day < full_start:
+                    parts.append(partial(first_day, full_start))
+                parts.append(rollup.select(*period_bounds(rollup.df, full_start, full_end), filters))
+                if full_end <= last_day:
+                    parts.append(partial(full_end, last_day + pd.Timedelta(days=1)))
+            aggregated_df = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    # Sort the dataframe by 'Sales Period' in ascending order
+    aggregated_df = aggregated_df.reset_index(drop=True)
+    aggregated_df.sort_values(['Sales Period'], ascending=True, inplace=True)
+
+    # Round the Sales Amount to 2 decimal places
+    aggregated_df['Sales Amount'] = aggregated_df['Sales Amount'].round(2)
+
+    return aggregated_df
+
+
+def _sum_by_code(codes, values, count):
+    totals = np.bincount(codes, weights=values, minlength=count)
+    if np.issubdtype(values.dtype, np.integer):
+        totals = np.rint(totals).astype(np.int64)
+    return totals
+
+
+def _totals_frame(column, codes, measures):
+    values = pd.Categorical.from_codes(codes, dtype=column.dtype)
+    return pd.DataFrame({column.name: values, **measures})
+
+
+def dimension_totals(df):
+    """
+    Function to sum the measures per Item, Category, Family and Material in one pass.
+
+    The measures are summed once per item code with bincount; since every item belongs to
+    exactly one category, family and material, the totals of those dimensions are then
+    rolled up from the item totals instead of from the rows.
+
+    Args:
+    - df (pd.DataFrame): Output of query_sales (categorical dimension columns).
+
+    Returns:
+    - dict: DataFrame per dimension with the dimension column and MEASURE_COLUMNS, holding
+      the values present in df in category order (like a groupby with observed=True).
+    """
+    item_codes = df['Item'].cat.codes.values
+    present = item_codes >= 0
+    item_codes = item_codes[present]
+    item_count = len(df['Item'].cat.categories)
+
+    rows = np.bincount(item_codes, minlength=item_count)
+    measures = {col: _sum_by_code(item_codes, df[col].values[present], item_count) for col in MEASURE_COLUMNS}
+    items = np.flatnonzero(rows)
+    totals = {'Item': _totals_frame(df['Item'], items, {col: measures[col][items] for col in MEASURE_COLUMNS})}
+
+    for column in ITEM_ATTRIBUTES:
+        # Value of the dimension for each item present in df
+        parent = np.full(item_count, -1, dtype=np.int64)
+        parent[item_codes] = df[column].cat.codes.values[present]
+        parent = parent[items]
+        keep = parent >= 0
+        count = len(df[column].cat.categories)
+        rolled = {col: _sum_by_code(parent[keep], measures[col][items][keep], count) for col in MEASURE_COLUMNS}
+        codes = np.flatnonzero(np.bincount(parent[keep], minlength=count))
+        totals[column] = _totals_frame(df[column], codes, {col: rolled[col][codes] for col in MEASURE_COLUMNS})
+    return totals
+
+
+def top_k(values, k, ascending=False):
+    """
+    Function to return the positions of the k smallest or largest values in sorted order.
+
+    The k candidates are found with a partial selection (argpartition), so only those are
+    sorted. Ties are broken by position, which gives the same result as a stable full sort
+    followed by head(k).
+
+    Args:
+    - values (np.ndarray): Values to rank.
+    - k (int): Number of positions to return (None for all).
+    - ascending (bool): Whether to return the smallest values first.
+
+    Returns:
+    - np.ndarray: Positions in values.
+    """
+    keys = np.asarray(values) if ascending else -np.asarray(values)
+    if k is not None and k < len(keys):
+        kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+        better = np.flatnonzero(keys < kth)
+        ties = np.flatnonzero(keys == kth)[:k - len(better)]
+        candidates = np.concatenate([better, ties])
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+
+
+def bucket_totals(df, column, buckets, measure='Sales Amount'):
+    """
+    Function to sum a measure per bucket of dimension values in one pass.
+
+    The measure is summed once per category code with bincount, and the per-value sums
+    are then added up per bucket through a code -> bucket lookup.
+
+    Args:
+    - df (pd.DataFrame): Output of query_sales.
+    - column (str): Categorical dimension column the buckets are made of (e.g. 'Material').
+    - buckets (list): Values of each bucket. A bucket given as None collects every value
+      not listed in another bucket.
+    - measure (str): Column to sum.
+
+    Returns:
+    - np.ndarray: Sum of the measure per bucket, in the order of buckets.
+    """
+    categories = df[column].cat.categories
+    # Bucket of every category code, plus a last slot for missing values
+    bucket_of_code = np.full(len(categories) + 1, -1, dtype=np.int64)
+    for position, values in enumerate(buckets):
+        if values is not None:
+            bucket_of_code[category_codes(df[column], values)] = position
+    for position, values in enumerate(buckets):
+        if values is None:
+            bucket_of_code[bucket_of_code == -1] = position
+
+    codes = df[column].cat.codes.values
+    value_totals = np.bincount(np.where(codes >= 0, codes, len(categories)), weights=df[measure].values,
+                               minlength=len(categories) + 1)
+    keep = bucket_of_code >= 0
+    return np.bincount(bucket_of_code[keep], weights=value_totals[keep], minlength=len(buckets))
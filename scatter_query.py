@@ -0,0 +1,39 @@
+def reduce_scatter(df, x_column, y_column, size_column, max_points):
+    """
+    Function to reduce the filtered data to the markers of the scatter plot.
+
+    Rows sharing the same (x, y) pair would be drawn on top of each other, so they are
+    combined into one marker whose size is the summed measure. If more than max_points
+    markers remain, only the max_points largest ones are kept: the plot shows where the
+    sales are concentrated and the dropped markers are the smallest ones, which would be
+    drawn at the minimum size anyway. The selection is deterministic, so the same filters
+    always give the same figure.
+
+    Args:
+    - df (pd.DataFrame): Output of filter_data.
+    - x_column, y_column (str): Columns plotted on the x and y axes.
+    - size_column (str): Measure summed into the marker size.
+    - max_points (int): Maximum number of markers.
+
+    Returns:
+    - pd.DataFrame: One row per marker with x_column, y_column, size_column, 'Rows' (number
+      of combined rows) and 'Text' (hover text), in (x, y) order.
+    - int: Number of markers dropped by the cap.
+    """
+    keys = list(dict.fromkeys([x_column, y_column]))
+    markers = df.groupby(keys, observed=True, sort=True).agg(**{
+        size_column: (size_column, 'sum'),
+        'Rows': ('Item', 'size'),
+        'Items': ('Item', 'nunique'),
+        'First Item': ('Item', 'first'),
+    }).reset_index()
+
+    dropped = max(0, len(markers) - max_points)
+    if dropped:
+        largest = markers[size_column].nlargest(max_points, keep='first').index
+        markers = markers.loc[largest.sort_values()].reset_index(drop=True)
+
+    # Name the item when the marker holds a single one, otherwise how many it combines
+    markers['Text'] = markers['First Item'].astype(str).where(
+        markers['Items'] == 1, markers['Items'].astype(str) + ' items')
+    return markers[keys + [size_column, 'Rows', 'Text']], dropped
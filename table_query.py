@@ -0,0 +1,188 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Columns of the data table, in display order
+TABLE_COLUMNS = ['Sales Period', 'Item', 'Category', 'Material', 'Family', 'Sales Quantity', 'Sales Amount']
+NUMERIC_COLUMNS = ['Sales Quantity', 'Sales Amount']
+
+# Operators of the DataTable filter query syntax, longest spellings first
+FILTER_OPERATORS = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+PERIOD_FORMAT = "%m/%d/%Y"
+
+
+def split_filter_part(filter_part):
+    """
+    Function to parse one '&&'-separated term of a DataTable filter query.
+
+    Args:
+    - filter_part (str): Term such as '{Sales Quantity} > 10' or '{Item} contains NB'.
+
+    Returns:
+    - tuple: (column, operator, value), or (None, None, None) if the term is not understood.
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # word operators need spaces after them in the filter string,
+                # but we don't want these later
+                return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+def _as_text(value):
+    # Numbers typed into a text column filter ('= 10') are parsed as floats
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _compare(values, operator, value):
+    if operator == 'eq':
+        return values == value
+    if operator == 'ne':
+        return values != value
+    if operator == 'lt':
+        return values < value
+    if operator == 'le':
+        return values <= value
+    if operator == 'gt':
+        return values > value
+    return values >= value
+
+
+def _filter_mask(df, column, operator, value):
+    series = df[column]
+
+    if column == 'Sales Period':
+        if operator in ('contains', 'datestartswith'):
+            text = series.dt.strftime(PERIOD_FORMAT)
+            if operator == 'datestartswith':
+                return text.str.startswith(_as_text(value)).values
+            return text.str.contains(_as_text(value), regex=False).values
+        value = pd.to_datetime(str(value), errors='coerce')
+        if pd.isna(value):
+            return np.zeros(len(df), dtype=bool)
+        return _compare(series, operator, value).values
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Evaluate the condition once per distinct value, then map it onto the rows by code
+        categories = series.cat.categories.astype(str)
+        value = _as_text(value)
+        if operator == 'contains':
+            matches = categories.str.contains(value, regex=False)
+        elif operator == 'datestartswith':
+            matches = categories.str.startswith(value)
+        else:
+            matches = _compare(categories, operator, value)
+        codes = series.cat.codes.values
+        return (codes >= 0) & np.asarray(matches)[codes]
+
+    if operator == 'contains':
+        return series.astype(str).str.contains(_as_text(value), regex=False).values
+    if operator == 'datestartswith':
+        return series.astype(str).str.startswith(_as_text(value)).values
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.zeros(len(df), dtype=bool)
+    return _compare(series, operator, value).values
+
+
+def filter_table(df, filter_query):
+    """
+    Function to apply a DataTable filter query to the filtered data.
+
+    Args:
+    - df (pd.DataFrame): Output of filter_data.
+    - filter_query (str): Filter query of the table ('' for none).
+
+    Returns:
+    - pd.DataFrame: Matching rows.
+    """
+    if not filter_query:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for filter_part in filter_query.split(' && '):
+        column, operator, value = split_filter_part(filter_part)
+        if column in df.columns:
+            mask &= _filter_mask(df, column, operator, value)
+    return df[mask]
+
+
+def sort_table(df, sort_by):
+    """
+    Function to apply the DataTable sort order.
+
+    Args:
+    - df (pd.DataFrame): Table rows.
+    - sort_by (list): [{'column_id': ..., 'direction': 'asc' | 'desc'}, ...].
+
+    Returns:
+    - pd.DataFrame: Sorted rows.
+    """
+    sort_by = [col for col in (sort_by or []) if col.get('column_id') in df.columns]
+    if not sort_by:
+        return df
+    return df.sort_values([col['column_id'] for col in sort_by],
+                          ascending=[col['direction'] == 'asc' for col in sort_by],
+                          kind='stable')
+
+
+def table_columns():
+    """
+    Function to build the column definitions of the data table.
+    """
+    return [{'name': col, 'id': col, 'type': 'numeric' if col in NUMERIC_COLUMNS else 'text'}
+            for col in TABLE_COLUMNS]
+
+
+def table_page(df, page_current, page_size):
+    """
+    Function to format one page of the table.
+
+    Args:
+    - df (pd.DataFrame): Filtered and sorted table rows.
+    - page_current (int): Zero-based page number.
+    - page_size (int): Rows per page.
+
+    Returns:
+    - list: Records of the page, with 'Sales Period' formatted as MM/DD/YYYY.
+    - int: Number of pages.
+    - int: Page number actually returned, page_current clamped to the available pages.
+    """
+    page_size = page_size or 20
+    page_count = max(1, math.ceil(len(df) / page_size))
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    page = df.iloc[page_current * page_size: (page_current + 1) * page_size]
+
+    # Format 'Sales Period' as string in 'MM/DD/YYYY' format if it's a Timestamp
+    if pd.api.types.is_datetime64_any_dtype(page['Sales Period']):
+        page = page.assign(**{'Sales Period': page['Sales Period'].dt.strftime(PERIOD_FORMAT)})
+
+    return page[TABLE_COLUMNS].to_dict('records'), page_count, page_current
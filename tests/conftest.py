@@ -0,0 +1,38 @@
+import os
+import sys
+
+# The modules live at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ITEMS = ['ED-F1-SS-3-L1L2', 'ED-F1-TI-3-L3L16', 'RN-F76-RB-13', 'BB-F2-YG-L1', 'SN-F9-NB/TI-4',
+         'PL-F3-WG-L5L8', 'JU-F4-BR-L1L4', 'NC-F5-XX-1', 'OT-F6-CHAIN', 'ZZ-F7-SS-1']
+
+
+def make_so_lines(seed, days=30, rows=2000, start='2024-01-01'):
+    """Random sales order lines with the columns of the export, 'Date' as M/D/YYYY."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq='D')
+    picked = dates[rng.integers(0, days, rows)]
+    return pd.DataFrame({
+        'Internal ID': np.arange(rows),
+        'Document Number': [f"SO{n}" for n in rng.integers(0, rows // 4, rows)],
+        'Item': rng.choice(ITEMS, rows),
+        'Product Set ID': rng.integers(0, 50, rows),
+        'Date': [f"{d.month}/{d.day}/{d.year}" for d in picked],
+        'Quantity': rng.integers(1, 20, rows),
+        'Amount': rng.integers(100, 100_000, rows) / 100,
+        'Memo': 'x',
+    })
+
+
+@pytest.fixture
+def write_so_export(tmp_path):
+    def write(lines, name='SalesOrder.csv'):
+        path = tmp_path / name
+        lines.to_csv(path, index=False)
+        return str(path)
+    return write
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from conftest import make_so_lines
+from data_transform_functions import (SO_COLUMNS, SO_DTYPES, encode_sales_data, filter_so, hash_so_days,
+                                      join_item_dimension, load_so_csv_changes, parse_skus, replace_sales_days,
+                                      sort_sales_days)
+
+
+def prepare(agg_df):
+    # Same steps as main.prepare_merged_df (main loads the reports at import)
+    codes, dimension = parse_skus(agg_df['Item'])
+    df = join_item_dimension(agg_df, codes, dimension, ['Item', 'Category', 'Family', 'Material'])
+    df = df[~dimension['Unknown'].values[codes]]
+    df = df[['Item', 'Category', 'Family', 'Material', 'Sales Date', 'Sales Quantity', 'Sales Amount']]
+    return sort_sales_days(encode_sales_data(df))
+
+
+def build(path, previous=None, chunksize=300):
+    previous_df, previous_state = previous if previous is not None else (None, {})
+    agg_df, day_hashes, stale_days = load_so_csv_changes(path, previous_state.get('day_hashes'),
+                                                         chunksize=chunksize)
+    merged_df = prepare(agg_df)
+    if previous_df is not None:
+        merged_df = replace_sales_days(previous_df, merged_df, stale_days)
+    return merged_df, {'day_hashes': day_hashes}
+
+
+def test_incremental_matches_full_rebuild(write_so_export):
+    old = make_so_lines(seed=1)
+    new = old.copy()
+    # Edit the lines of one day, drop another day and append lines of two new days
+    edited = new['Date'] == '1/5/2024'
+    new.loc[edited, 'Quantity'] += 1
+    new = new[new['Date'] != '1/9/2024']
+    new = pd.concat([new, make_so_lines(seed=2, days=2, rows=100, start='2024-01-31')], ignore_index=True)
+
+    previous = build(write_so_export(old, 'old.csv'))
+    incremental_df, incremental_state = build(write_so_export(new, 'new.csv'), previous)
+    full_df, full_state = build(write_so_export(new, 'new.csv'))
+
+    pd.testing.assert_frame_equal(incremental_df, full_df)
+    assert incremental_state == full_state
+
+
+def test_day_fingerprints_are_exact(write_so_export):
+    lines = make_so_lines(seed=3)
+    _, day_hashes, _ = load_so_csv_changes(write_so_export(lines), chunksize=300)
+
+    expected = hash_so_days(filter_so(pd.read_csv(write_so_export(lines), usecols=SO_COLUMNS, dtype=SO_DTYPES)))
+    for day, (row_hash, rows) in day_hashes.items():
+        assert type(row_hash) is int
+        assert row_hash == int(expected.loc[day, 'Row Hash'])
+        assert rows == expected.loc[day, 'Rows']
+    assert max(row_hash for row_hash, _ in day_hashes.values()) > 2 ** 53
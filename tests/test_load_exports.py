@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from conftest import make_so_lines
+from data_transform_functions import load_so_csv, load_so_exports
+
+
+def export(rows):
+    lines = pd.DataFrame(rows, columns=['Document Number', 'Item', 'Date', 'Quantity', 'Amount'])
+    return lines.assign(**{'Internal ID': range(len(lines)), 'Product Set ID': 1, 'Memo': 'x'})
+
+
+def sales(agg_df):
+    return {(item, date): (quantity, amount) for item, date, quantity, amount in agg_df.itertuples(index=False)}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_each_order_is_taken_from_the_newest_export(write_so_export, workers):
+    older = write_so_export(export([
+        ['SO1', 'ED-F1-SS-3', '1/2/2024', 1, 10.0],
+        ['SO2', 'ED-F1-SS-3', '1/2/2024', 2, 20.0],
+        ['SO2', 'RN-F76-RB-13', '1/3/2024', 1, 5.0],
+        ['SO3', 'BB-F2-YG-1', '1/3/2024', 4, 40.0],
+        ['SO4', 'SN-F9-NB-4', '1/4/2024', 1, 7.0],
+    ]), 'older.csv')
+    newer = write_so_export(export([
+        # SO1 is unchanged, SO2 edited (quantity, amount and a line removed)
+        ['SO1', 'ED-F1-SS-3', '1/2/2024', 1, 10.0],
+        ['SO2', 'ED-F1-SS-3', '1/2/2024', 3, 30.0],
+        # SO3 now only holds an item outside the dashboard product lines
+        ['SO3', 'ZZ-F2-YG-1', '1/3/2024', 4, 40.0],
+        # SO5 is new and repeats a line
+        ['SO5', 'SN-F9-NB-4', '1/4/2024', 2, 14.0],
+        ['SO5', 'SN-F9-NB-4', '1/4/2024', 2, 14.0],
+    ]), 'newer.csv')
+
+    # SO4 is only in the older export
+    assert sales(load_so_exports([older, newer], workers=workers)) == {
+        ('ED-F1-SS-3', '1/2/2024'): (4.0, 40.0),
+        ('SN-F9-NB-4', '1/4/2024'): (5.0, 35.0),
+    }
+
+
+def test_overlapping_exports_match_the_whole_export(write_so_export):
+    lines = make_so_lines(seed=4)
+    lines = lines.sort_values('Document Number', kind='stable')
+    documents = lines['Document Number'].unique()
+    first = lines[lines['Document Number'].isin(documents[:len(documents) * 2 // 3])]
+    second = lines[lines['Document Number'].isin(documents[len(documents) // 3:])]
+
+    expected = load_so_csv(write_so_export(lines, 'all.csv'))
+    result = load_so_exports([write_so_export(first, 'first.csv'), write_so_export(second, 'second.csv')],
+                             workers=2)
+    key = ['Item', 'Sales Date']
+    pd.testing.assert_frame_equal(result.sort_values(key, ignore_index=True),
+                                  expected.sort_values(key, ignore_index=True), check_exact=False)
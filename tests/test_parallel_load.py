@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import make_so_lines
+from data_transform_functions import (classify_sales, csv_chunk_ranges, encode_sales_data, load_so_csv_changes,
+                                      load_so_csv_changes_parallel, sort_sales_days)
+
+
+@pytest.fixture
+def so_export(write_so_export):
+    lines = make_so_lines(seed=5, rows=3000)
+    # Quoted memos spanning several lines, and blank lines between the rows
+    lines.loc[lines.index % 7 == 0, 'Memo'] = 'first line\nsecond, "quoted" line\n'
+    parts = [lines.iloc[start:start + 250].to_csv(index=False, header=start == 0)
+             for start in range(0, len(lines), 250)]
+    path = write_so_export(lines, 'export.csv')
+    with open(path, 'w', newline='') as f:
+        f.write('\n\n'.join(parts))
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [13, 500, 10_000])
+def test_chunk_ranges_match_pandas_chunks(so_export, chunksize):
+    header, ranges = csv_chunk_ranges(so_export, chunksize, block_size=4096)
+    with open(so_export, 'rb') as f:
+        data = f.read()
+    chunks = [pd.read_csv(io.BytesIO(header + data[start:end]), dtype=str) for start, end in ranges]
+    expected = list(pd.read_csv(so_export, dtype=str, chunksize=chunksize))
+    assert len(chunks) == len(expected)
+    for chunk, expected_chunk in zip(chunks, expected):
+        pd.testing.assert_frame_equal(chunk, expected_chunk.reset_index(drop=True))
+
+
+def encoded(classified_df):
+    return sort_sales_days(encode_sales_data(classified_df))
+
+
+@pytest.mark.parametrize('chunksize, min_date', [(400, None), (10_000, None), (400, '2024-01-12')])
+def test_parallel_load_matches_serial(so_export, chunksize, min_date):
+    agg_df, day_hashes, stale_days = load_so_csv_changes(so_export, min_date=min_date, chunksize=chunksize)
+    serial_df, serial_dimension = classify_sales(agg_df)
+    parallel_df, parallel_dimension, parallel_hashes, parallel_stale = load_so_csv_changes_parallel(
+        so_export, min_date=min_date, chunksize=chunksize, workers=2)
+
+    pd.testing.assert_frame_equal(encoded(parallel_df), encoded(serial_df), check_exact=True)
+    pd.testing.assert_frame_equal(parallel_dimension, serial_dimension)
+    assert min_date is None or len(day_hashes) < 30
+    assert (parallel_hashes, parallel_stale) == (day_hashes, stale_days)
+
+    # Incremental load against a build that knew half of the days
+    previous = dict(list(day_hashes.items())[::2])
+    agg_df, _, stale_days = load_so_csv_changes(so_export, previous, min_date, chunksize)
+    parallel_df, _, _, parallel_stale = load_so_csv_changes_parallel(so_export, previous, min_date, chunksize,
+                                                                     workers=2)
+    pd.testing.assert_frame_equal(encoded(parallel_df), encoded(classify_sales(agg_df)[0]), check_exact=True)
+    assert parallel_stale == stale_days
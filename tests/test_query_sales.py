@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import Dataset
+from data_transform_functions import encode_sales_data
+from sales_query import GROUP_COLUMNS, query_sales
+
+ITEMS = {
+    'ED-F1-SS-3': ('ED', 'F1', 'SS'),
+    'ED-F1-TI-3': ('ED', 'F1', 'TI'),
+    'ED-F2-SS-4': ('ED', 'F2', 'SS'),
+    'RN-F76-RB-13': ('RN', 'F76', 'RB'),
+    'BB-F2-YG-1': ('BB', 'F2', 'YG'),
+    'SN-F9-NB-4': ('SN', 'F9', 'NB'),
+}
+
+
+def make_sales(seed=0, rows=3000):
+    rng = np.random.default_rng(seed)
+    items = rng.choice(list(ITEMS), rows)
+    df = pd.DataFrame({
+        'Item': items,
+        'Category': [ITEMS[item][0] for item in items],
+        'Family': [ITEMS[item][1] for item in items],
+        'Material': [ITEMS[item][2] for item in items],
+        'Sales Date': pd.Timestamp('2023-11-20') + pd.to_timedelta(rng.integers(0, 500, rows), unit='D'),
+        'Sales Quantity': rng.integers(1, 20, rows),
+        'Sales Amount': rng.integers(100, 100_000, rows) / 100,
+    })
+    # One row per item and day, like the aggregated export
+    df = df.groupby(['Item', 'Category', 'Family', 'Material', 'Sales Date'], as_index=False).sum()
+    return encode_sales_data(df).sort_values(['Sales Date', 'Item'], kind='stable').reset_index(drop=True)
+
+
+def baseline_filter_data(merged_df, start_date, end_date, type_filter, category_filter, family_filter,
+                         material_filter, item_filter):
+    # filter_data as it was before the rollups, on plain string columns
+    filtered_df = merged_df.astype({col: str for col in ['Item', 'Category', 'Family', 'Material']})
+    if start_date and end_date:
+        filtered_df = filtered_df[(filtered_df['Sales Date'] >= pd.to_datetime(start_date)) &
+                                  (filtered_df['Sales Date'] <= pd.to_datetime(end_date))]
+    for column, values in [('Category', category_filter), ('Family', family_filter),
+                           ('Material', material_filter), ('Item', item_filter)]:
+        if values:
+            filtered_df = filtered_df[filtered_df[column].isin(values)]
+    if type_filter in ('D', 'W', 'M', 'Y'):
+        periods = filtered_df['Sales Date'].dt.to_period(type_filter).dt.to_timestamp()
+    else:
+        periods = filtered_df['Sales Date']
+    aggregated_df = filtered_df.assign(**{'Sales Period': periods}).groupby(GROUP_COLUMNS).agg({
+        'Sales Quantity': 'sum',
+        'Sales Amount': 'sum'
+    }).reset_index()
+    aggregated_df['Sales Amount'] = aggregated_df['Sales Amount'].round(2)
+    return aggregated_df
+
+
+def normalized(df):
+    df = df.astype({col: str for col in GROUP_COLUMNS[1:]})
+    return df.sort_values(GROUP_COLUMNS).reset_index(drop=True)[GROUP_COLUMNS + ['Sales Quantity', 'Sales Amount']]
+
+
+@pytest.fixture(scope='module')
+def merged_df():
+    return make_sales()
+
+
+@pytest.mark.parametrize('type_filter', ['D', 'W', 'M', 'Y', None])
+@pytest.mark.parametrize('start_date, end_date', [
+    (None, None),
+    ('2023-11-20', '2025-04-02'),
+    ('2024-01-01', '2024-12-31'),
+    ('2023-12-13', '2024-03-05'),
+    ('2024-02-29T00:00:00', '2024-03-01T00:00:00'),
+    ('2024-05-08', '2024-05-08'),
+    ('2024-06-01T12:00:00', '2024-06-03T06:00:00'),
+    ('2024-06-10', '2024-06-01'),
+])
+@pytest.mark.parametrize('selection', [
+    {},
+    {'category_filter': ['ED']},
+    {'family_filter': ['F2', 'F9'], 'material_filter': ['SS', 'NB', 'XX']},
+    {'item_filter': ['RN-F76-RB-13', 'ED-F1-TI-3'], 'category_filter': ['RN', 'ED', 'BB']},
+])
+def test_query_sales_matches_filter_data(merged_df, type_filter, start_date, end_date, selection):
+    filters = [selection.get(name, []) for name in
+               ['category_filter', 'family_filter', 'material_filter', 'item_filter']]
+    expected = baseline_filter_data(merged_df, start_date, end_date, type_filter, *filters)
+
+    start, end = (pd.to_datetime(start_date), pd.to_datetime(end_date)) if start_date else (None, None)
+    result = query_sales(Dataset(merged_df), start, end, type_filter,
+                         *[tuple(sorted(set(values))) for values in filters])
+
+    assert result['Sales Period'].is_monotonic_increasing
+    result, expected = normalized(result), normalized(expected)
+    pd.testing.assert_frame_equal(result.drop(columns='Sales Amount'), expected.drop(columns='Sales Amount'),
+                                  check_dtype=False)
+    np.testing.assert_allclose(result['Sales Amount'], expected['Sales Amount'], atol=0.011)
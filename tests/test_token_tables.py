@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_transform_functions import (MATERIAL_TOKENS, LENGTH_TOKENS, classify, classify_items, extract_length,
+                                      extract_material)
+
+
+@pytest.mark.parametrize('token_table', [MATERIAL_TOKENS, LENGTH_TOKENS], ids=['material', 'length'])
+def test_every_token_is_reachable(token_table):
+    # An entry is shadowed when an earlier token is contained in it
+    for position, (token, label) in enumerate(token_table):
+        assert classify(f"xx{token}xx", token_table) == label, token
+        shadowing = [earlier for earlier, _ in token_table[:position] if earlier in token]
+        assert not shadowing, (token, shadowing)
+
+
+@pytest.mark.parametrize('item, length', [
+    ('ED-F1-SS-3-L1L2', '1/2'),
+    ('ED-F1-SS-3-L3L16', '3/16'),
+    ('ED-F1-SS-3-L1L4', '1/4'),
+    ('ED-F1-SS-3-L1 1L8', '1 1/8'),
+    ('ED-F1-SS-3-L1', '1"'),
+    ('BL1-X', 'Unknown'),
+])
+def test_extract_length(item, length):
+    assert extract_length(item) == length
+
+
+def test_extract_material_order():
+    assert extract_material('ED-F1-SS-3') == 'SS'
+    assert extract_material('ED-F1-NB/HM-3') == 'NB/HM'
+    assert extract_material('ED-F1-TLEPOST-3') == 'TLE'
+    assert extract_material('ED-F1-XX-3') == 'Unknown'
+
+
+def test_classify_items_matches_classify():
+    rng = np.random.default_rng(0)
+    fragments = [token for token, _ in MATERIAL_TOKENS + LENGTH_TOKENS] + ['ED', 'F1', '-', 'x', 'L', '1']
+    items = pd.Series([''.join(rng.choice(fragments, size=rng.integers(1, 5)).tolist()).upper() for _ in range(2000)]
+                      + [None], index=np.arange(2001) * 3)
+    for token_table in (MATERIAL_TOKENS, LENGTH_TOKENS):
+        expected = ['Unknown' if pd.isna(item) else classify(item, token_table) for item in items]
+        result = classify_items(items, token_table)
+        assert result.index.equals(items.index)
+        assert result.tolist() == expected